@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from classifier import bag_of_words, normalize
+from engine import ConversationEngine, ConversationSession, load_chatbot_data
+from session import Message, Sender
+from prediction_cache import PredictionCache
+from preprocessing import clean_up_sentence
+from transcript import custom_escape, render_message
+
+# Metrics where a higher value is worse, checked against the baseline.
+REGRESSION_METRICS = ('p50_us', 'p95_us', 'p99_us')
+
+# Run in a fresh interpreter so imports and artifact loading are cold.
+_STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import engine
+imported = time.perf_counter()
+engine.load_chatbot_data({backend!r})
+loaded = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - started) * 1000.0, 'load_ms': (loaded - imported) * 1000.0}}))
+"""
+
+
+def load_corpus(path='intent_new.json', limit=None):
+    # Every pattern in file order, so runs on the same intents file are
+    # comparable.
+    with open(path, 'r', encoding='utf-8') as file:
+        intents = json.load(file)
+    if isinstance(intents, dict):
+        intents = intents['intents']
+    corpus = [pattern for intent in intents for pattern in intent.get('patterns', [])]
+    return corpus[:limit] if limit else corpus
+
+
+def build_stages(engine, corpus):
+    # name -> (function of one corpus item, items). Inputs that depend on an
+    # earlier stage are computed here, outside the timed calls.
+    user_data = {'name': 'Ravi', 'stream': 'MPC', 'major': 'computer science', 'year': '2nd Year', 'field': 'MBA'}
+    intents = [engine.predict_batch([text])[0] for text in corpus]
+    bot_messages = [Message(Sender.BOT, engine.get_response(i, user_data)[0]) for i in intents]
+    vectors = [engine.vectorizer.transform([normalize(text)]) for text in corpus]
+
+    uncached = ConversationEngine(engine.intents, engine.words, engine.classes, engine.vectorizer, engine.model,
+                                  model_version=engine.model_version, cache=PredictionCache(maxsize=0),
+                                  pattern_index=engine.pattern_index)
+    cached = ConversationEngine(engine.intents, engine.words, engine.classes, engine.vectorizer, engine.model,
+                                model_version=engine.model_version, pattern_index=engine.pattern_index)
+    for text in corpus:
+        cached.predict_class(text)
+
+    session = ConversationSession()
+
+    def turn(on):
+        # A whole turn on the given engine; 'turn' runs without the prediction
+        # cache, 'turn_cached' with a cache already holding every pattern.
+        def run(text):
+            session.chat_history.clear()
+            session.conversation_state = 'post_12th_stream_provided'
+            session.user_data = dict(user_data)
+            on.handle_message(session, text)
+        return run
+
+    stages = {
+        'clean_up_sentence': (clean_up_sentence, corpus),
+        'bag_of_words': (lambda text: bag_of_words(text, engine.vectorizer), corpus),
+        'model_predict': (engine.model.predict, vectors),
+        'predict_class': (uncached.predict_class, corpus),
+        'predict_class_cached': (cached.predict_class, corpus),
+        'get_response': (lambda i: engine.get_response(i, user_data), intents),
+        'custom_escape': (custom_escape, [m.text for m in bot_messages]),
+        'render_message': (render_message, bot_messages),
+        'turn': (turn(uncached), corpus),
+        'turn_cached': (turn(cached), corpus),
+    }
+    if engine.pattern_index is not None:
+        stages['nearest_pattern'] = (lambda vector: engine.pattern_index.nearest(vector, 3), vectors)
+    return stages
+
+
+def time_stage(fn, items, repeat):
+    for item in items:
+        fn(item)
+    samples = np.empty(len(items) * repeat, dtype=np.float64)
+    clock = time.perf_counter
+    k = 0
+    started = clock()
+    for _ in range(repeat):
+        for item in items:
+            t0 = clock()
+            fn(item)
+            samples[k] = clock() - t0
+            k += 1
+    wall = clock() - started
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1e6
+    return {
+        'calls': int(k),
+        'mean_us': round(float(samples.mean() * 1e6), 3),
+        'p50_us': round(float(p50), 3),
+        'p95_us': round(float(p95), 3),
+        'p99_us': round(float(p99), 3),
+        'max_us': round(float(samples.max() * 1e6), 3),
+        'throughput_per_s': round(k / wall, 1),
+    }
+
+
+def peak_memory(fn, items):
+    # Peak Python and NumPy allocation over one pass, above what was already
+    # allocated; measured separately so tracing does not skew the timings.
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for item in items:
+            fn(item)
+        return round((tracemalloc.get_traced_memory()[1] - baseline) / 1024.0, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def measure_startup(backend, runs):
+    script = _STARTUP_SCRIPT.format(backend=backend)
+    results = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+        wall_ms = (time.perf_counter() - started) * 1000.0
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result['process_ms'] = wall_ms
+        results.append(result)
+    return {
+        'runs': runs,
+        **{f'{key}_p50': round(float(np.median([r[key] for r in results])), 2) for key in ('import_ms', 'load_ms', 'process_ms')},
+        **{f'{key}_min': round(min(r[key] for r in results), 2) for key in ('import_ms', 'load_ms', 'process_ms')},
+    }
+
+
+def run(args):
+    corpus = load_corpus(limit=args.limit)
+    intents, words, classes, vectorizer, model, version, pattern_index = load_chatbot_data(args.backend)
+    engine = ConversationEngine(intents, words, classes, vectorizer, model, model_version=version,
+                                pattern_index=pattern_index)
+    stages = build_stages(engine, corpus)
+    selected = args.stages or list(stages)
+
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'backend': args.backend or os.environ.get('CAREERVIHARI_BACKEND', 'numpy'),
+            'model_version': version,
+            'corpus_size': len(corpus),
+            'repeat': args.repeat,
+        },
+        'stages': {},
+    }
+    for name in selected:
+        fn, items = stages[name]
+        result = time_stage(fn, items, args.repeat)
+        if not args.no_memory:
+            result['peak_memory_kb'] = peak_memory(fn, items)
+        report['stages'][name] = result
+        print(f"{name:<22} p50 {result['p50_us']:9.1f} us  p95 {result['p95_us']:9.1f} us  "
+              f"p99 {result['p99_us']:9.1f} us  {result['throughput_per_s']:10.1f}/s"
+              + (f"  peak {result['peak_memory_kb']:8.1f} KiB" if 'peak_memory_kb' in result else ''))
+    if args.startup_runs > 0:
+        report['startup'] = measure_startup(args.backend, args.startup_runs)
+        startup = report['startup']
+        print(f"{'startup':<22} import {startup['import_ms_p50']:.1f} ms  load_chatbot_data {startup['load_ms_p50']:.1f} ms  "
+              f"process {startup['process_ms_p50']:.1f} ms (p50 of {startup['runs']})")
+    return report
+
+
+def compare(report, baseline, tolerance):
+    # Prints the change against the baseline per stage and returns the
+    # regressions: latency percentiles more than `tolerance` slower, or
+    # throughput more than `tolerance` lower.
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['meta'].get('created_at', '?')} "
+          f"(model {baseline['meta'].get('model_version')}):")
+    for name, result in report['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if before is None:
+            print(f"  {name:<22} (not in baseline)")
+            continue
+        changes = []
+        for metric in REGRESSION_METRICS + ('throughput_per_s',):
+            if not before.get(metric):
+                continue
+            change = result[metric] / before[metric] - 1.0
+            worse = change > tolerance if metric in REGRESSION_METRICS else change < -tolerance
+            if worse:
+                regressions.append((name, metric, before[metric], result[metric]))
+            changes.append(f"{metric.replace('_us', '').replace('_per_s', '')} {change * 100.0:+6.1f}%{' !' if worse else ''}")
+        print(f"  {name:<22} " + '  '.join(changes))
+    before_startup, after_startup = baseline.get('startup'), report.get('startup')
+    if before_startup and after_startup:
+        change = after_startup['process_ms_p50'] / before_startup['process_ms_p50'] - 1.0
+        worse = change > tolerance
+        if worse:
+            regressions.append(('startup', 'process_ms_p50', before_startup['process_ms_p50'], after_startup['process_ms_p50']))
+        print(f"  {'startup':<22} process {change * 100.0:+6.1f}%{' !' if worse else ''}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the per-turn hot path on the intent_new.json patterns.")
+    parser.add_argument('--output', default='benchmark.json', help="where to write the JSON results")
+    parser.add_argument('--baseline', help="earlier results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed slowdown before a stage counts as a regression")
+    parser.add_argument('--backend', choices=('numpy', 'keras'))
+    parser.add_argument('--stages', nargs='+', help="only run these stages")
+    parser.add_argument('--repeat', type=int, default=3, help="timed passes over the corpus per stage")
+    parser.add_argument('--limit', type=int, help="use only the first N patterns")
+    parser.add_argument('--startup-runs', type=int, default=5, help="cold-start runs in fresh interpreters (0 to skip)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the traced peak-memory pass")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            raise SystemExit(1)
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import time
+
+import numpy as np
+
+from inference import QUANTIZATIONS, NumpyIntentModel, quantization_report
+from pattern_index import ARRAYS as PATTERN_ARRAYS, PatternIndex
+
+# Layout: MAGIC, little-endian uint32 format version and header length, the
+# JSON header, then each array at a 64-byte aligned offset from the start of
+# the data section. Arrays are read as zero-copy views of a read-only mmap, so
+# every process that loads the bundle shares one physical copy of the weights.
+# Format 2 added quantized kernels (float16, or int8 with per-channel scales).
+MAGIC = b'CVBUNDLE'
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+ALIGNMENT = 64
+BUNDLE_PATH = os.environ.get('CAREERVIHARI_BUNDLE', 'model_bundle.cvb')
+# Serve the float16 or int8 copy of the bundle written next to BUNDLE_PATH.
+QUANTIZATION = os.environ.get('CAREERVIHARI_QUANTIZATION') or None
+
+_PREFIX = struct.Struct('<8sII')
+
+
+class BundleVectorizer:
+    # The parts of sklearn's TfidfVectorizer the app uses, rebuilt from the
+    # vocabulary and IDF vector: word analyzer, raw counts, tf * idf, L2 norm.
+
+    def __init__(self, vocabulary, idf, token_pattern=r"(?u)\b\w\w+\b", lowercase=True, norm='l2', sublinear_tf=False):
+        self.vocabulary_ = vocabulary
+        self.idf_ = idf
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self._token_re = re.compile(token_pattern)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer):
+        params = vectorizer.get_params()
+        if params['analyzer'] != 'word' or tuple(params['ngram_range']) != (1, 1):
+            raise ValueError("Only word unigram TF-IDF vectorizers can be bundled")
+        if params['tokenizer'] is not None or params['preprocessor'] is not None or params['strip_accents'] is not None:
+            raise ValueError("Custom tokenizers, preprocessors and accent stripping cannot be bundled")
+        if params['binary'] or not params['use_idf'] or params['norm'] not in ('l2', None):
+            raise ValueError("Only l2 or unnormalised TF-IDF with raw counts can be bundled")
+        vocabulary = {term: int(index) for term, index in vectorizer.vocabulary_.items()}
+        return cls(vocabulary, np.asarray(vectorizer.idf_, dtype=np.float64), params['token_pattern'],
+                   params['lowercase'], params['norm'], params['sublinear_tf'])
+
+    def config(self):
+        return {
+            'token_pattern': self.token_pattern,
+            'lowercase': self.lowercase,
+            'norm': self.norm,
+            'sublinear_tf': self.sublinear_tf,
+        }
+
+    def transform(self, raw_documents):
+        from scipy.sparse import csr_matrix
+
+        indptr = [0]
+        indices = []
+        data = []
+        for doc in raw_documents:
+            if self.lowercase:
+                doc = doc.lower()
+            counts = {}
+            for token in self._token_re.findall(doc):
+                j = self.vocabulary_.get(token)
+                if j is not None:
+                    counts[j] = counts.get(j, 0) + 1
+            if counts:
+                cols = sorted(counts)
+                values = np.array([counts[c] for c in cols], dtype=np.float64)
+                if self.sublinear_tf:
+                    values = np.log(values) + 1.0
+                values *= self.idf_[cols]
+                if self.norm == 'l2':
+                    values /= np.sqrt(np.dot(values, values))
+                indices.extend(cols)
+                data.extend(values)
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, len(self.idf_)),
+        )
+
+
+class ModelBundle:
+    def __init__(self, header, arrays, mapping=None):
+        self.header = header
+        self.arrays = arrays
+        self._mapping = mapping
+        self.bundle_id = header['bundle_id']
+        self.words = header['words']
+        # Bundles written before this was recorded have none; seeding then
+        # lemmatizes the vocabulary itself.
+        self.lemmas = header.get('lemmas')
+        self.classes = header['classes']
+        self.intents = header['intents']
+        self.vectorizer = BundleVectorizer(header['vocabulary'], arrays['idf'], **header['vectorizer'])
+        self.quantization = header.get('quantization')
+        self.model = NumpyIntentModel([
+            (arrays[layer['kernel']], arrays[layer['bias']], layer['activation'])
+            for layer in header['layers']
+        ], [arrays[layer['scale']] if 'scale' in layer else None for layer in header['layers']])
+        # Bundles written before the pattern index existed have none.
+        self.pattern_index = None
+        if 'patterns' in header:
+            self.pattern_index = PatternIndex(*(arrays[name] for name in PATTERN_ARRAYS), header['patterns'],
+                                              self.classes, header['vocabulary'])
+
+
+def _compile_intents(intents):
+    return [{'tag': intent['tag'], 'responses': list(intent.get('responses') or [])} for intent in intents]
+
+
+def quantized_path(path, quantization):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{quantization}{ext}"
+
+
+def serving_path(path=BUNDLE_PATH, quantization=QUANTIZATION):
+    # The bundle to serve: the quantized copy when one was asked for and
+    # has been exported, otherwise the float32 bundle.
+    if not quantization:
+        return path
+    candidate = quantized_path(path, quantization)
+    if os.path.exists(candidate):
+        return candidate
+    print(f"Warning: {candidate} not found; serving the float32 {path}. Export it with new_train.py --quantize {quantization}.")
+    return path
+
+
+def write_bundle(path, words, classes, vectorizer, layers, intents, sources=None, pattern_index=None, quantization=None):
+    from preprocessing import changed_lemmas
+
+    if not isinstance(vectorizer, BundleVectorizer):
+        vectorizer = BundleVectorizer.from_sklearn(vectorizer)
+    scales = [None] * len(layers)
+    kernel_dtype = {None: '<f4', 'float16': '<f2', 'int8': 'i1'}[quantization]
+    if quantization is not None:
+        quantized = NumpyIntentModel(layers).quantize(quantization)
+        layers, scales = quantized.layers, quantized.scales
+
+    arrays = {'idf': np.ascontiguousarray(vectorizer.idf_, dtype='<f8')}
+    layer_specs = []
+    for i, ((kernel, bias, activation), scale) in enumerate(zip(layers, scales)):
+        arrays[f'layer{i}.kernel'] = np.ascontiguousarray(kernel, dtype=kernel_dtype)
+        arrays[f'layer{i}.bias'] = np.ascontiguousarray(bias, dtype='<f4')
+        layer_specs.append({'kernel': f'layer{i}.kernel', 'bias': f'layer{i}.bias', 'activation': activation})
+        if scale is not None:
+            arrays[f'layer{i}.scale'] = np.ascontiguousarray(scale, dtype='<f4')
+            layer_specs[-1]['scale'] = f'layer{i}.scale'
+    if pattern_index is not None:
+        arrays.update(pattern_index.arrays())
+
+    array_specs = {}
+    offset = 0
+    digest = hashlib.sha256()
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        array_specs[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+        digest.update(name.encode('utf-8'))
+        digest.update(array.tobytes())
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'words': list(words),
+        'lemmas': changed_lemmas(words),
+        'classes': list(classes),
+        'vocabulary': dict(vectorizer.vocabulary_),
+        'vectorizer': vectorizer.config(),
+        'layers': layer_specs,
+        'intents': _compile_intents(intents),
+        'sources': sources or {},
+        'arrays': array_specs,
+        'quantization': quantization,
+    }
+    if pattern_index is not None:
+        header['patterns'] = pattern_index.texts
+    digest.update(json.dumps({k: v for k, v in header.items() if k != 'created_at'}, sort_keys=True).encode('utf-8'))
+    header['bundle_id'] = digest.hexdigest()[:16]
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = -(-(_PREFIX.size + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + array_specs[name]['offset'])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return header['bundle_id']
+
+
+def load_bundle(path=BUNDLE_PATH):
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, header_length = _PREFIX.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a CareerVihari model bundle")
+    if version not in READABLE_VERSIONS:
+        raise ValueError(f"{path} has bundle format {version}, expected one of {READABLE_VERSIONS}; rebuild it with new_train.py")
+    header = json.loads(mapping[_PREFIX.size:_PREFIX.size + header_length].decode('utf-8'))
+    data_start = -(-(_PREFIX.size + header_length) // ALIGNMENT) * ALIGNMENT
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        array = np.frombuffer(mapping, dtype=dtype, count=count, offset=data_start + spec['offset'])
+        arrays[name] = array.reshape(spec['shape'])
+    return ModelBundle(header, arrays, mapping)
+
+
+def export_quantized(path, quantizations, words, classes, vectorizer, layers, intents, X, labels, sources=None,
+                     pattern_index=None):
+    # Writes one quantized bundle per mode next to path and prints how each
+    # compares with the float32 model on X (the training patterns).
+    model = NumpyIntentModel(layers)
+    for quantization in quantizations:
+        output = quantized_path(path, quantization)
+        bundle_id = write_bundle(output, words, classes, vectorizer, layers, intents, sources, pattern_index, quantization)
+        report = quantization_report(model, load_bundle(output).model, X, labels)
+        print(f"Wrote {output} (bundle {bundle_id}, {os.path.getsize(output)} bytes): "
+              f"accuracy {report['accuracy_float32']:.4f} float32 -> {report['accuracy_quantized']:.4f} {quantization}, "
+              f"top-1 agreement {report['top1_agreement']:.4f}, max probability difference {report['max_abs_difference']:.2e}, "
+              f"kernels {report['kernel_bytes_float32']} -> {report['kernel_bytes_quantized']} bytes")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+if __name__ == '__main__':
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Build a model bundle from the existing pickle and HDF5 artifacts.")
+    parser.add_argument('--output', default=BUNDLE_PATH)
+    parser.add_argument('--intents', default='intent_new.json')
+    parser.add_argument('--words', default='words_new.pkl')
+    parser.add_argument('--classes', default='classes_new.pkl')
+    parser.add_argument('--vectorizer', default='vectorizer_new.pkl')
+    parser.add_argument('--model', default='model_new.h5')
+    parser.add_argument('--quantize', nargs='+', choices=QUANTIZATIONS, default=[],
+                        help="also write quantized copies and report their accuracy on the patterns")
+    args = parser.parse_args()
+
+    with open(args.intents, 'r', encoding='utf-8') as file:
+        intents = json.load(file)
+    if isinstance(intents, dict):
+        intents = intents['intents']
+    words = pickle.load(open(args.words, 'rb'))
+    classes = pickle.load(open(args.classes, 'rb'))
+    vectorizer = pickle.load(open(args.vectorizer, 'rb'))
+    model = NumpyIntentModel.from_h5(args.model)
+
+    from preprocessing import clean_up_sentence, seed_lemmas
+
+    seed_lemmas(words)
+    texts = [pattern for intent in intents for pattern in intent.get('patterns', [])]
+    tags = [intent['tag'] for intent in intents for _ in intent.get('patterns', [])]
+    normalized = [' '.join(clean_up_sentence(text)) for text in texts]
+    index = PatternIndex.build(vectorizer, normalized, texts, tags, classes)
+    sources = {'intents_sha256': file_sha256(args.intents)}
+
+    bundle_id = write_bundle(args.output, words, classes, vectorizer, model.layers, intents, sources, index)
+    print(f"Wrote {args.output} (bundle {bundle_id}, {os.path.getsize(args.output)} bytes)")
+    if args.quantize:
+        class_index = {tag: i for i, tag in enumerate(classes)}
+        export_quantized(args.output, args.quantize, words, classes, vectorizer, model.layers, intents,
+                         vectorizer.transform(normalized), np.array([class_index[tag] for tag in tags]), sources, index)
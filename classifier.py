@@ -0,0 +1,55 @@
+import numpy as np
+
+from metrics import metrics
+from preprocessing import clean_up_sentence
+
+ERROR_THRESHOLD = 0.25
+
+
+def bag_of_words(sentence, vectorizer):
+    return bag_of_words_batch([sentence], vectorizer)
+
+
+def normalize(sentence):
+    with metrics.span('tokenize'):
+        return ' '.join(clean_up_sentence(sentence))
+
+
+def bag_of_words_batch(sentences, vectorizer):
+    cleaned = [normalize(sentence) for sentence in sentences]
+    # Left as CSR; the model's first layer multiplies it sparsely.
+    return vectorizer.transform(cleaned)
+
+
+def rank_intents(res, classes):
+    results = [[i, r] for i, r in enumerate(res) if r > ERROR_THRESHOLD]
+    results.sort(key=lambda x: x[1], reverse=True)
+    return_list = []
+    for r in results:
+        return_list.append({'intent': classes[r[0]], 'probability': str(r[1])})
+    if not return_list:
+        return_list.append({'intent': 'unknown', 'probability': '1.0'})
+    return return_list
+
+
+def top_intents(res, classes, k):
+    # The k most probable intents, unthresholded, as (intent, probability).
+    k = min(k, len(res))
+    top = np.argpartition(res, -k)[-k:]
+    top = top[np.argsort(res[top])[::-1]]
+    return [(classes[i], float(res[i])) for i in top]
+
+
+def predict_normalized(texts, model, classes, vectorizer):
+    # texts are already normalize()d.
+    with metrics.span('tfidf'):
+        bow = vectorizer.transform(texts)
+    with metrics.span('inference'):
+        res = model.predict(bow)
+    return [rank_intents(row, classes) for row in res]
+
+
+def predict_classes(sentences, model, classes, vectorizer):
+    bow = bag_of_words_batch(sentences, vectorizer)
+    res = model.predict(bow)
+    return [rank_intents(row, classes) for row in res]
@@ -0,0 +1,202 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+
+from classifier import ERROR_THRESHOLD, normalize, top_intents
+from workers import available_cpus
+
+_model = None
+
+
+def _load(backend):
+    global _model
+    from engine import load_chatbot_data
+
+    _, _, classes, vectorizer, model, version, _ = load_chatbot_data(backend)
+    _model = (classes, vectorizer, model)
+    return version
+
+
+def _classify(texts, top_k):
+    # Runs in the worker processes: the preprocessing is as costly as the
+    # inference, so both happen here rather than in the reader.
+    classes, vectorizer, model = _model
+    res = model.predict(vectorizer.transform([normalize(text) for text in texts]))
+    return [top_intents(row, classes, top_k) for row in res]
+
+
+def read_batches(file, fmt, field, batch_size):
+    # Yields (rows, end_offset, end_line) with rows as (line, text or None,
+    # error). end_offset is the byte offset just past the batch, so a run can
+    # resume from it.
+    rows = []
+    line_no = 0
+    while True:
+        raw = file.readline()
+        if not raw:
+            break
+        line_no += 1
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            continue
+        if fmt == 'jsonl':
+            try:
+                record = json.loads(line)
+                text = record[field] if isinstance(record, dict) else record
+                if not isinstance(text, str):
+                    raise ValueError(f"'{field}' is not a string")
+                rows.append((line_no, text, None))
+            except (ValueError, KeyError) as e:
+                rows.append((line_no, None, f"{type(e).__name__}: {e}"))
+        else:
+            rows.append((line_no, line, None))
+        if len(rows) >= batch_size:
+            yield rows, file.tell(), line_no
+            rows = []
+    yield rows, file.tell(), line_no
+
+
+class Progress:
+    # Where a run has got to, saved next to the output after every batch so
+    # an interrupted run can pick up from the last written row.
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+
+def run(args):
+    input_path = os.path.abspath(args.input)
+    fmt = args.format or ('jsonl' if input_path.endswith(('.jsonl', '.ndjson')) else 'text')
+    progress = Progress(f"{args.output}.progress")
+    state = {'input': input_path, 'offset': 0, 'line': 0, 'rows': 0, 'output_bytes': 0}
+    if args.resume:
+        saved = progress.load()
+        if saved is None:
+            print(f"No progress file for {args.output}; starting from the beginning.", file=sys.stderr)
+        elif saved['input'] != input_path:
+            raise SystemExit(f"{progress.path} is for {saved['input']}, not {input_path}")
+        else:
+            state = saved
+
+    out = open(args.output, 'r+b' if state['output_bytes'] else 'wb')
+    # Drop anything written after the last saved offset, so rows from an
+    # interrupted batch are not duplicated.
+    out.truncate(state['output_bytes'])
+    out.seek(state['output_bytes'])
+
+    if args.processes > 0:
+        pool = multiprocessing.get_context('spawn').Pool(args.processes, initializer=_load, initargs=(args.backend,))
+        submit = lambda texts: pool.apply_async(_classify, (texts, args.top_k))
+    else:
+        pool = None
+        _load(args.backend)
+        submit = lambda texts: _Done(_classify(texts, args.top_k))
+    # At most this many batches are read ahead of the one being written.
+    window = max(args.processes, 1) * 2
+
+    started = time.perf_counter()
+    last_report = started
+    rows_done = 0
+    unknown = 0
+    top_counts = Counter()
+    in_flight = deque()
+
+    def write(rows, result, end_offset, end_line):
+        nonlocal rows_done, unknown
+        predictions = iter(result.get())
+        lines = []
+        for line_no, text, error in rows:
+            if error is not None:
+                lines.append(json.dumps({'line': line_no, 'error': error}, ensure_ascii=False))
+                continue
+            intents = next(predictions)
+            if intents[0][1] <= ERROR_THRESHOLD:
+                unknown += 1
+            top_counts[intents[0][0]] += 1
+            lines.append(json.dumps({
+                'line': line_no,
+                'text': text,
+                'intents': [{'intent': intent, 'probability': round(p, 6)} for intent, p in intents],
+            }, ensure_ascii=False))
+        if lines:
+            out.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        out.flush()
+        rows_done += len(rows)
+        state.update(offset=end_offset, line=end_line, rows=state['rows'] + len(rows), output_bytes=out.tell())
+        progress.save(state)
+
+    try:
+        with open(input_path, 'rb') as f:
+            f.seek(state['offset'])
+            line_base = state['line']
+            for rows, end_offset, end_line in read_batches(f, fmt, args.field, args.batch_size):
+                rows = [(line_base + n, text, error) for n, text, error in rows]
+                texts = [text for _, text, error in rows if error is None]
+                in_flight.append((rows, submit(texts) if texts else _Done([]), end_offset, line_base + end_line))
+                while len(in_flight) >= window:
+                    write(*in_flight.popleft())
+                now = time.perf_counter()
+                if now - last_report >= args.report_every:
+                    last_report = now
+                    print(f"{state['rows']:>10} rows  {rows_done / (now - started):10.1f} rows/s  "
+                          f"offset {state['offset']}", file=sys.stderr)
+            while in_flight:
+                write(*in_flight.popleft())
+    finally:
+        out.close()
+        if pool is not None:
+            pool.terminate()
+
+    elapsed = time.perf_counter() - started
+    classified = sum(top_counts.values())
+    print(f"Classified {rows_done} rows in {elapsed:.1f} s ({rows_done / elapsed if elapsed else 0.0:.1f} rows/s); "
+          f"{state['rows']} rows in {args.output} so far.", file=sys.stderr)
+    if classified:
+        print(f"Top intent at or below {ERROR_THRESHOLD} (unknown): {unknown} ({unknown / classified:.1%})", file=sys.stderr)
+        for intent, n in top_counts.most_common(args.summary):
+            print(f"  {intent:<30} {n:>8}  {n / classified:6.1%}", file=sys.stderr)
+
+
+class _Done:
+    # Stands in for an AsyncResult when classifying in-process.
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+if __name__ == '__main__':
+    cpus = available_cpus()
+    parser = argparse.ArgumentParser(description="Classify a file of logged messages, one per line, with the intent model.")
+    parser.add_argument('input', help="text file (one message per line) or JSONL file")
+    parser.add_argument('--output', required=True, help="JSONL file to write the top intents per line to")
+    parser.add_argument('--format', choices=('text', 'jsonl'), help="input format (default: from the file extension)")
+    parser.add_argument('--field', default='text', help="JSONL key holding the message")
+    parser.add_argument('--top-k', type=int, default=3, help="intents to report per line")
+    parser.add_argument('--batch-size', type=int, default=512, help="lines per batch")
+    parser.add_argument('--processes', type=int, default=cpus if cpus > 1 else 0,
+                        help="worker processes (0 classifies in this process)")
+    parser.add_argument('--backend', choices=('numpy', 'keras'))
+    parser.add_argument('--resume', action='store_true', help="continue from the progress saved next to --output")
+    parser.add_argument('--report-every', type=float, default=5.0, help="seconds between progress lines")
+    parser.add_argument('--summary', type=int, default=10, help="most frequent top intents to list at the end")
+    run(parser.parse_args())
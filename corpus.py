@@ -0,0 +1,193 @@
+import json
+import os
+import re
+from collections import defaultdict
+
+from bundle import file_sha256
+from responses import PLACEHOLDERS
+
+INTENTS_PATH = 'intent_new.json'
+COMPILED_PATH = os.environ.get('CAREERVIHARI_COMPILED_INTENTS', 'intents_compiled.json')
+COMPILED_FORMAT = 1
+# Serve a build older than intent_new.json with a warning instead of failing.
+ALLOW_STALE = os.environ.get('CAREERVIHARI_ALLOW_STALE') == '1'
+
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+
+class Issue:
+    __slots__ = ('level', 'code', 'tag', 'message')
+
+    def __init__(self, level, code, tag, message):
+        self.level = level
+        self.code = code
+        self.tag = tag
+        self.message = message
+
+    def __str__(self):
+        return f"{self.level}: [{self.code}] {self.tag}: {self.message}"
+
+
+def read_intents(path=INTENTS_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        intents = json.load(f)
+    if isinstance(intents, dict) and 'intents' in intents:
+        intents = intents['intents']
+    return intents
+
+
+def validate_intents(intents, classes=None, strict=False):
+    # Errors make the corpus unusable: malformed intents, duplicate or
+    # reserved tags, intents with no responses, and tags that do not match
+    # the model's classes. Duplicate patterns and unknown placeholders (which
+    # are shown to users literally) are warnings unless strict is set.
+    issues = []
+    soft = 'error' if strict else 'warning'
+    if not isinstance(intents, list):
+        return [Issue('error', 'structure', '-', f"expected a list of intents, got {type(intents).__name__}")]
+    if not intents:
+        return [Issue('error', 'structure', '-', "no intents")]
+
+    tags = {}
+    pattern_tags = defaultdict(list)
+    for n, intent in enumerate(intents):
+        if not isinstance(intent, dict):
+            issues.append(Issue('error', 'structure', f"#{n}", f"expected a dictionary, got {type(intent).__name__}"))
+            continue
+        tag = intent.get('tag')
+        if not isinstance(tag, str) or not tag.strip():
+            issues.append(Issue('error', 'missing_tag', f"#{n}", "intent has no tag"))
+            continue
+        if tag in tags:
+            issues.append(Issue('error', 'duplicate_tag', tag, f"intents #{tags[tag]} and #{n} share this tag"))
+        tags.setdefault(tag, n)
+        if tag == 'unknown':
+            issues.append(Issue('error', 'reserved_tag', tag, "'unknown' is what the classifier returns below the threshold"))
+
+        patterns = intent.get('patterns')
+        if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+            issues.append(Issue('error', 'patterns', tag, "'patterns' must be a list of strings"))
+        elif not patterns:
+            issues.append(Issue('warning', 'no_patterns', tag, "no patterns, so the model cannot learn this intent"))
+        else:
+            for pattern in patterns:
+                key = ' '.join(pattern.lower().split())
+                if key:
+                    pattern_tags[key].append(tag)
+                else:
+                    issues.append(Issue('warning', 'empty_pattern', tag, "empty pattern"))
+
+        responses = intent.get('responses')
+        if not isinstance(responses, list) or not all(isinstance(r, str) for r in responses):
+            issues.append(Issue('error', 'responses', tag, "'responses' must be a list of strings"))
+        elif not any(r.strip() for r in responses):
+            issues.append(Issue('error', 'missing_responses', tag, "no responses"))
+        else:
+            unknown = sorted({name for r in responses for name in _PLACEHOLDER_RE.findall(r) if name not in PLACEHOLDERS})
+            if unknown:
+                issues.append(Issue(soft, 'unknown_placeholder', tag,
+                                    f"{', '.join('{' + name + '}' for name in unknown)} would be shown literally"))
+
+    for pattern, owners in pattern_tags.items():
+        distinct = list(dict.fromkeys(owners))
+        if len(distinct) > 1:
+            issues.append(Issue(soft, 'duplicate_pattern', distinct[0], f"{pattern!r} is also a pattern of {', '.join(distinct[1:])}"))
+        elif len(owners) > 1:
+            issues.append(Issue('warning', 'repeated_pattern', distinct[0], f"{pattern!r} appears {len(owners)} times"))
+
+    if classes is not None:
+        for tag in sorted(set(tags) - set(classes)):
+            issues.append(Issue('error', 'tag_without_class', tag, "not a class of the trained model; retrain with new_train.py"))
+        for tag in sorted(set(classes) - set(tags)):
+            issues.append(Issue('error', 'class_without_intent', tag, "the model predicts this class but no intent has the tag"))
+    return issues
+
+
+def compile_intents(intents, source_sha256=None):
+    # Tags in sorted order, which is the model's class order, so a tag's id
+    # is its class index; responses are indexed by tag id.
+    by_tag = {intent['tag']: intent for intent in intents}
+    tags = sorted(by_tag)
+    return {
+        'format': COMPILED_FORMAT,
+        'source_sha256': source_sha256,
+        'tags': tags,
+        'responses': [list(by_tag[tag]['responses']) for tag in tags],
+    }
+
+
+def write_compiled(compiled, path=COMPILED_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(compiled, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+class CompiledCorpus:
+    def __init__(self, compiled):
+        self.tags = compiled['tags']
+        self.responses = compiled['responses']
+        self.source_sha256 = compiled.get('source_sha256')
+        self.tag_ids = {tag: i for i, tag in enumerate(self.tags)}
+
+    def intents(self):
+        return [{'tag': tag, 'responses': responses} for tag, responses in zip(self.tags, self.responses)]
+
+    def check_classes(self, classes, path=COMPILED_PATH):
+        if list(classes) != self.tags:
+            raise ValueError(f"{path} was compiled for different tags than the model's classes; retrain with new_train.py")
+
+
+def check_fresh(expected_sha256, built, source=INTENTS_PATH, rebuild='python new_train.py'):
+    # Fails when source has changed since `built` was made from it.
+    if not expected_sha256 or not os.path.exists(source) or file_sha256(source) == expected_sha256:
+        return
+    message = f"{source} has changed since {built} was built; rebuild it with {rebuild}."
+    if ALLOW_STALE:
+        print(f"Warning: {message}")
+        return
+    raise ValueError(f"{message} Set CAREERVIHARI_ALLOW_STALE=1 to serve it anyway.")
+
+
+def load_compiled(path=COMPILED_PATH, source=INTENTS_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; build it with python corpus.py")
+    with open(path, 'r', encoding='utf-8') as f:
+        compiled = json.load(f)
+    if compiled.get('format') != COMPILED_FORMAT:
+        raise ValueError(f"{path} has format {compiled.get('format')}, expected {COMPILED_FORMAT}; rebuild it with python corpus.py")
+    check_fresh(compiled.get('source_sha256'), path, source, 'python corpus.py (or new_train.py)')
+    return CompiledCorpus(compiled)
+
+
+if __name__ == '__main__':
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Validate intent_new.json and compile it for serving.")
+    parser.add_argument('--intents', default=INTENTS_PATH)
+    parser.add_argument('--classes', default='classes_new.pkl', help="the model's classes, to check tags against")
+    parser.add_argument('--output', default=COMPILED_PATH)
+    parser.add_argument('--strict', action='store_true', help="treat duplicate patterns and unknown placeholders as errors")
+    parser.add_argument('--check', action='store_true', help="validate only; do not write the compiled file")
+    args = parser.parse_args()
+
+    try:
+        intents = read_intents(args.intents)
+    except (OSError, json.JSONDecodeError) as e:
+        raise SystemExit(f"Could not read {args.intents}: {e}")
+    classes = None
+    if os.path.exists(args.classes):
+        with open(args.classes, 'rb') as f:
+            classes = pickle.load(f)
+
+    issues = validate_intents(intents, classes, args.strict)
+    for issue in issues:
+        print(issue)
+    errors = sum(issue.level == 'error' for issue in issues)
+    print(f"{len(intents)} intents: {errors} errors, {len(issues) - errors} warnings")
+    if errors:
+        raise SystemExit(1)
+    if not args.check:
+        write_compiled(compile_intents(intents, file_sha256(args.intents)), args.output)
+        print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes)")
@@ -0,0 +1,220 @@
+import re
+
+from responses import ResponseTemplate, stream_career_paths
+
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+NAME_REPLY = "Arey {name}, what a cool name! Please give me your email next, okay?"
+STREAM_CHOSEN_REPLY = "Cool, you're a {stream} student! What would you like to know—careers, exams, or something else? Explore [Official Website](https://example.com) for resources."
+STREAM_MENTIONED_REPLY = "Yes, you mentioned your stream is {stream}. What would you like to know about it?"
+STREAM_KEYWORDS = ('mpc', 'bipc', 'commerce')
+
+
+class Rule:
+    # One branch of a state: it fires when any keyword occurs in the
+    # lowercased input, or the top intent is one of intents, and then `when`
+    # (if given) holds. A rule with no keywords or intents fires whenever
+    # `when` holds, so a bare Rule is the state's catch-all. On firing,
+    # updates go into user_data, action(session, user_input) runs, the reply
+    # template is rendered and the state moves to next_state. A rule with no
+    # reply leaves the model's response in place.
+    __slots__ = ('keywords', 'intents', 'when', 'updates', 'action', 'reply', 'next_state')
+
+    def __init__(self, keywords=(), intents=(), when=None, updates=None, action=None, reply=None, next_state=None):
+        if keywords and when is not None:
+            raise ValueError("A keyword rule cannot also have a `when` condition")
+        self.keywords = tuple(keywords)
+        self.intents = tuple(intents)
+        self.when = when
+        self.updates = updates
+        self.action = action
+        self.reply = ResponseTemplate(reply) if reply is not None else None
+        self.next_state = next_state
+
+    def allows(self, session, user_input):
+        return self.when is None or self.when(session, user_input)
+
+    def apply(self, session, user_input):
+        if self.updates:
+            session.user_data.update(self.updates)
+        if self.action is not None:
+            self.action(session, user_input)
+        if self.next_state is not None:
+            session.conversation_state = self.next_state
+        if self.reply is None:
+            return None
+        return self.reply.render(session.user_data)
+
+
+class StateMatcher:
+    # All keywords of one state compiled into a single regex. Each position
+    # of the input is tried against a lookahead alternation ordered by rule,
+    # so the first group that matches there is the highest-priority rule with
+    # a keyword at that position; the lowest over one scan is the rule the
+    # old chain of `in` checks would have picked.
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        alternatives = [
+            f"(?P<r{index}>{'|'.join(re.escape(k) for k in rule.keywords)})"
+            for index, rule in enumerate(self.rules) if rule.keywords
+        ]
+        self._keyword_re = re.compile(f"(?=(?:{'|'.join(alternatives)}))") if alternatives else None
+        self._first_keyword_rule = next((i for i, rule in enumerate(self.rules) if rule.keywords), None)
+
+    def keyword_rule(self, user_input):
+        if self._keyword_re is None:
+            return None
+        best = None
+        for match in self._keyword_re.finditer(user_input.lower()):
+            index = int(match.lastgroup[1:])
+            if best is None or index < best:
+                best = index
+                if best == self._first_keyword_rule:
+                    break
+        return best
+
+    def match(self, session, user_input, intent):
+        # intent() returns the top predicted intent; it is only called when a
+        # rule that depends on it is reached.
+        hit = self.keyword_rule(user_input)
+        for index, rule in enumerate(self.rules):
+            if index == hit:
+                return rule
+            if rule.intents:
+                if intent() in rule.intents and rule.allows(session, user_input):
+                    return rule
+            elif not rule.keywords and rule.allows(session, user_input):
+                return rule
+        return None
+
+
+class DialogueTable:
+    # state -> StateMatcher, compiled once at startup. States not in the table
+    # answer with the model's response.
+
+    def __init__(self, states):
+        self._matchers = {}
+        for names, rules in states.items():
+            matcher = StateMatcher(rules)
+            for name in (names if isinstance(names, tuple) else (names,)):
+                self._matchers[name] = matcher
+
+    def __contains__(self, state):
+        return state in self._matchers
+
+    def match(self, session, user_input, intent):
+        matcher = self._matchers.get(session.conversation_state)
+        if matcher is None:
+            return None
+        return matcher.match(session, user_input, intent)
+
+
+def _short_input(session, user_input):
+    return len(user_input.split()) <= 2
+
+
+def _remember_name(session, user_input):
+    session.user_data['name'] = user_input
+
+
+def _remember_stated_name(session, user_input):
+    name = user_input
+    if "my name is" in user_input.lower():
+        name = user_input.lower().replace("my name is", "").strip()
+    session.user_data['name'] = name
+
+
+def _is_email(session, user_input):
+    return EMAIL_RE.match(user_input) is not None
+
+
+def _remember_email(session, user_input):
+    session.user_data['email'] = user_input
+
+
+def _mark_stage_prompt(session, user_input):
+    session.stage_prompt_displayed = True
+
+
+def _known_new_stream(session, user_input):
+    return 'stream' not in session.user_data and user_input.upper() in stream_career_paths
+
+
+def _no_stream(session, user_input):
+    return 'stream' not in session.user_data
+
+
+def _remember_stream(session, user_input):
+    session.user_data['stream'] = user_input.upper()
+
+
+DIALOGUE_STATES = {
+    'initial': [
+        Rule(intents=('unknown',), when=_short_input, action=_remember_name, reply=NAME_REPLY, next_state='asking_email'),
+        Rule(intents=('initial_name',), keywords=('name',), action=_remember_stated_name, reply=NAME_REPLY,
+             next_state='asking_email'),
+        Rule(reply="Sorry, I didn’t get that! Can you tell me your name to start?"),
+    ],
+    'asking_email': [
+        Rule(when=_is_email, action=_remember_email, next_state='stage_selection',
+             reply="Thanks for sharing, {name}! Let me check… is this correct: {email}?"),
+        Rule(reply="Oops, that doesn’t look like a proper email. Can you try again?"),
+    ],
+    'stage_selection': [
+        Rule(action=_mark_stage_prompt,
+             reply="Please use the buttons to select your educational stage (Post-10th, Post-12th, Undergraduate, or Postgraduate)."),
+    ],
+    'post_10th': [
+        Rule(keywords=('yes',), next_state='post_10th_group_selection',
+             reply="Great, {name}! Which group are you thinking of taking—MPC, BiPC, or Commerce?"),
+        Rule(keywords=('no need', "don't need"), next_state='post_10th_clarification',
+             reply="Okay, {name}! It sounds like you might not be ready to decide yet. Do you want to explore some career paths, or would you like to know more about the groups you can choose after 10th (like MPC, BiPC, or Commerce)?"),
+        Rule(keywords=('help', 'decide'), next_state='post_10th_group_selection',
+             reply="Let’s explore your options, {name}! After 10th, you can choose groups like MPC (Maths, Physics, Chemistry), BiPC (Biology, Physics, Chemistry), or Commerce. Which one are you interested in, or do you want to know more about them?"),
+    ],
+    'post_10th_clarification': [
+        Rule(keywords=('career',), next_state='post_10th_group_selection',
+             reply="Great! Let’s explore some career paths. After 10th, you can choose groups like MPC (leads to engineering, architecture), BiPC (leads to medicine, biotechnology), or Commerce (leads to accounting, business). Which one sounds interesting to you?"),
+        Rule(keywords=('group',) + STREAM_KEYWORDS, next_state='post_10th_group_selection',
+             reply="Let’s dive deeper! After 10th, you can choose MPC (Maths, Physics, Chemistry), BiPC (Biology, Physics, Chemistry), or Commerce. Which one are you interested in, or do you want to know more about them?"),
+    ],
+    'post_10th_group_selection': [
+        Rule(keywords=('mpc',), updates={'stream': "MPC"}, reply=STREAM_CHOSEN_REPLY, next_state='post_10th_mpc'),
+        Rule(keywords=('bipc',), updates={'stream': "BIPC"}, reply=STREAM_CHOSEN_REPLY, next_state='post_10th_bipc'),
+        Rule(keywords=('commerce',), updates={'stream': "COMMERCE"}, reply=STREAM_CHOSEN_REPLY,
+             next_state='post_10th_commerce'),
+        Rule(reply="Please choose a group: MPC, BiPC, or Commerce. Or let me know if you want more details about them!"),
+    ],
+    ('post_10th_mpc', 'post_10th_bipc', 'post_10th_commerce'): [
+        Rule(keywords=('career',),
+             reply="Lots of career options for you, {name}! With your background, you can look into {career_path}. Want more details? Check out [National Career Service](https://www.ncs.gov.in) for job opportunities."),
+        Rule(keywords=('exam', 'eapcet'),
+             reply="AP EAPCET is the new name for EAMCET in Andhra, {name}! It’s for engineering, agri, and pharmacy courses after 12th. You need PCM for engineering, PCB for others. Exam’s in May—start with 12th books! Want prep hacks? Check out [AP EAPCET Official Website](https://cets.apsche.ap.gov.in/EAPCET)."),
+        Rule(keywords=('polycet',),
+             reply="AP POLYCET is a great option for you, {name}! It’s an entrance exam for polytechnic diploma courses in Andhra Pradesh after 10th. You can pursue diplomas in engineering fields like Mechanical, Civil, or Electrical with your MPC background. The exam usually happens around April-May. Want to know more? Check out [AP POLYCET Official Website](https://polycetap.nic.in)."),
+    ],
+    'post_12th': [
+        Rule(when=_known_new_stream, action=_remember_stream, next_state='post_12th_stream_provided',
+             reply="Yay, {stream}! This can lead to {career_path}. What’s next—career options or entrance exams?"),
+        Rule(when=_no_stream,
+             reply="I’m not sure about that stream. Could you specify MPC, BiPC, Commerce, or another stream?"),
+        Rule(keywords=STREAM_KEYWORDS, reply=STREAM_MENTIONED_REPLY),
+    ],
+    'post_12th_stream_provided': [
+        Rule(keywords=STREAM_KEYWORDS, reply=STREAM_MENTIONED_REPLY),
+    ],
+    'postgraduate_options': [
+        Rule(keywords=('career',),
+             reply="With an {field} background, you can explore roles like management consultant, business analyst, or entrepreneur! Want to explore job opportunities? Check out [LinkedIn](https://www.linkedin.com) for career options."),
+        Rule(keywords=('research',),
+             reply="Research in {field} is a great choice! You can dive into areas like organizational behavior, finance, or marketing strategies. Check out [ResearchGate](https://www.researchgate.net) for research insights."),
+    ],
+    'awaiting_course_enjoyment_response': [
+        Rule(intents=('yes',), keywords=('yes', 'enjoying'), next_state='undergraduate_options',
+             reply="Awesome, {name}! I’m glad you’re enjoying your {major} course. What’s next—jobs, internships, or further studies?"),
+        Rule(intents=('no',), keywords=('no', 'not'), next_state='undergraduate_options',
+             reply="Oh no, you’re not liking it? Let’s explore options for a {year} {major} student—jobs, internships, or further studies? Check out [Internshala](https://internshala.com) for opportunities."),
+        Rule(reply="I’m not sure if you’re enjoying your course or not. Could you say 'yes' or 'no'?"),
+    ],
+}
@@ -0,0 +1,347 @@
+import hashlib
+import os
+import pickle
+import threading
+
+from bundle import file_sha256, load_bundle, serving_path
+from classifier import normalize, predict_normalized
+from corpus import check_fresh, load_compiled
+from dialogue import DIALOGUE_STATES, DialogueTable
+from inference import DEFAULT_BACKEND, load_intent_model
+from metrics import metrics
+from prediction_cache import PredictionCache
+from preprocessing import ensure_nltk_resources, lemma_cache, seed_lemmas, stats as preprocessing_stats
+from responses import ResponseIndex
+from scheduler import BatchScheduler, DEFAULT_MAX_BATCH_SIZE
+from session import ConversationSession, Sender
+from startup import startup_report
+from workers import DEFAULT_WORKERS, WorkerPool
+
+STAGES = ("Post-10th", "Post-12th", "Undergraduate", "Postgraduate")
+YEARS = ("1st Year", "2nd Year", "3rd Year", "4th Year")
+END_WORDS = ("bye", "goodbye", "exit", "quit")
+PRELOAD_WORDNET = os.environ.get('CAREERVIHARI_PRELOAD_WORDNET') == '1'
+# Cosine similarity a stored pattern needs to stand in for an unknown intent.
+FALLBACK_SIMILARITY = float(os.environ.get('CAREERVIHARI_FALLBACK_SIMILARITY', '0.5'))
+
+
+def load_chatbot_data(backend=None):
+    # The NumPy backend serves straight from the memory-mapped bundle when one
+    # has been built; the Keras backend still needs the original artifacts.
+    bundle_path = serving_path()
+    if (backend or DEFAULT_BACKEND) == 'numpy' and os.path.exists(bundle_path):
+        with startup_report.phase('bundle'):
+            bundle = load_bundle(bundle_path)
+            seed_lemmas(bundle.words, bundle.lemmas)
+        check_fresh(bundle.header['sources'].get('intents_sha256'), bundle_path)
+        return (bundle.intents, bundle.words, bundle.classes, bundle.vectorizer, bundle.model, bundle.bundle_id,
+                bundle.pattern_index)
+    return load_legacy_artifacts(backend)
+
+
+def load_legacy_artifacts(backend=None):
+    # intent_new.json is validated and compiled ahead of time (corpus.py);
+    # only the compiled form is read here.
+    with startup_report.phase('intents'):
+        corpus = load_compiled()
+        intents = corpus.intents()
+
+    with startup_report.phase('vocabulary'):
+        words = pickle.load(open('words_new.pkl', 'rb'))
+        seed_lemmas(words)
+        classes = pickle.load(open('classes_new.pkl', 'rb'))
+        corpus.check_classes(classes)
+    with startup_report.phase('vectorizer'):
+        vectorizer = pickle.load(open('vectorizer_new.pkl', 'rb'))
+    with startup_report.phase(f'model ({backend or DEFAULT_BACKEND})'):
+        model = load_intent_model('model_new.h5', backend)
+    # Identifies the artifacts the model was loaded from, like a bundle_id.
+    version = hashlib.sha256(''.join(
+        file_sha256(path) for path in ('words_new.pkl', 'classes_new.pkl', 'vectorizer_new.pkl', 'model_new.h5')
+    ).encode('ascii')).hexdigest()[:16]
+
+    return intents, words, classes, vectorizer, model, version, None
+
+
+def get_response(intents_list, response_index, user_data):
+    tag = intents_list[0]['intent']
+    result = response_index.render(tag, user_data)
+    return result, tag
+
+
+class TurnClassification:
+    # The intent model's verdict on one message, computed the first time a
+    # rule or the fallback response asks for it and reused after that.
+    __slots__ = ('_engine', 'text', '_intents')
+
+    def __init__(self, engine, text):
+        self._engine = engine
+        self.text = text
+        self._intents = None
+
+    @property
+    def computed(self):
+        return self._intents is not None
+
+    @property
+    def intents(self):
+        if self._intents is None:
+            self._intents = self._engine.predict_class(self.text)
+            metrics.inc('intents', 'intent', self._intents[0]['intent'])
+        return self._intents
+
+    def intent(self):
+        return self.intents[0]['intent']
+
+    def response(self, user_data):
+        return self._engine.get_response(self.intents, user_data)[0]
+
+
+class TurnStats:
+    # How many turns needed the intent model, overall and per state.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_state = {}
+
+    def record(self, state, classified):
+        with self._lock:
+            counts = self._by_state.setdefault(state, [0, 0])
+            counts[0] += 1
+            counts[1] += classified
+
+    def as_dict(self):
+        with self._lock:
+            by_state = {state: {'turns': t, 'classified': c, 'skipped': t - c} for state, (t, c) in self._by_state.items()}
+        turns = sum(v['turns'] for v in by_state.values())
+        skipped = sum(v['skipped'] for v in by_state.values())
+        return {
+            'turns': turns,
+            'classified': turns - skipped,
+            'skipped': skipped,
+            'skip_rate': skipped / turns if turns else 0.0,
+            'by_state': by_state,
+        }
+
+
+class ConversationEngine:
+    # The dialogue state machine. Every method takes the session it acts on
+    # and returns the bot messages it added, so any frontend can drive it.
+
+    def __init__(self, intents, words, classes, vectorizer, model, scheduler=None, pool=None, model_version=None,
+                 cache=None, pattern_index=None, fallback_similarity=FALLBACK_SIMILARITY):
+        self.intents = intents
+        self.words = words
+        self.classes = classes
+        self.vectorizer = vectorizer
+        self.model = model
+        self.scheduler = scheduler
+        self.pool = pool
+        self.model_version = model_version
+        self.cache = cache if cache is not None else PredictionCache()
+        self.pattern_index = pattern_index
+        self.fallback_similarity = fallback_similarity
+        self.responses = ResponseIndex(intents)
+        self.dialogue = DialogueTable(DIALOGUE_STATES)
+        self.turn_stats = TurnStats()
+
+    @classmethod
+    def from_files(cls, backend=None, batching=True, warmup=True, workers=DEFAULT_WORKERS):
+        intents, words, classes, vectorizer, model, version, pattern_index = load_chatbot_data(backend)
+        with startup_report.phase('responses'):
+            engine = cls(intents, words, classes, vectorizer, model, model_version=version, pattern_index=pattern_index)
+        if workers > 0:
+            bundle_path = serving_path()
+            if (backend or DEFAULT_BACKEND) == 'numpy' and os.path.exists(bundle_path):
+                with startup_report.phase('workers'):
+                    engine.pool = WorkerPool(bundle_path, workers)
+            else:
+                print("Worker processes need the NumPy backend and a model bundle; classifying in-process.")
+        if batching and DEFAULT_MAX_BATCH_SIZE > 1:
+            concurrency = engine.pool.size if engine.pool is not None else 1
+            engine.scheduler = BatchScheduler(engine.predict_normalized_batch, concurrency=concurrency)
+        if PRELOAD_WORDNET:
+            with startup_report.phase('nltk'):
+                missing = ensure_nltk_resources()
+                if missing:
+                    print(f"Missing NLTK resources (offline): {', '.join(missing)}")
+                lemma_cache.warm_up()
+        if warmup:
+            with startup_report.phase('warmup'):
+                engine.warmup()
+        startup_report.mark_ready()
+        print(startup_report.format())
+        # Keep warmup calls out of the serving metrics.
+        metrics.reset()
+        metrics.start_dump()
+        return engine
+
+    def warmup(self):
+        # Run the whole classification path once so the first real turn does
+        # not pay for lazy initialisation. Vocabulary words are already in the
+        # lemma cache, so this does not pull in NLTK or WordNet.
+        plain_words = [w for w in self.words if w.isascii() and w.isalnum()]
+        self.predict_batch([' '.join(plain_words[i:i + 8]) for i in range(0, min(len(plain_words), 32), 8)] or ['hello'])
+
+    def predict_batch(self, sentences):
+        return self.predict_normalized_batch([normalize(sentence) for sentence in sentences])
+
+    def predict_normalized_batch(self, texts):
+        if self.pool is not None:
+            return self.pool.predict_batch(texts)
+        return predict_normalized(texts, self.model, self.classes, self.vectorizer)
+
+    def predict_class(self, sentence):
+        # Repeated utterances ("hi", "yes", "thanks") are answered from the
+        # cache without touching the scheduler or the model. Cached lists are
+        # shared, so callers must not modify them.
+        text = normalize(sentence)
+        intents = self.cache.get(text)
+        if intents is not None:
+            metrics.inc('prediction_cache', 'result', 'hit')
+            return intents
+        metrics.inc('prediction_cache', 'result', 'miss')
+        # Queueing, TF-IDF and inference, in this process or a worker.
+        with metrics.span('classify'):
+            if self.scheduler is None:
+                intents = self.predict_normalized_batch([text])[0]
+            else:
+                intents = self.scheduler.predict(text)
+        if intents[0]['intent'] == 'unknown' and self.pattern_index is not None:
+            intents = self._nearest_pattern(text, intents)
+        self.cache.put(text, intents)
+        return intents
+
+    def _nearest_pattern(self, text, intents):
+        # No intent cleared the threshold: answer as the closest stored
+        # pattern's intent if it is similar enough.
+        with metrics.span('fallback'):
+            nearest = self.pattern_index.nearest(self.vectorizer.transform([text]), 1)
+        if not nearest or nearest[0]['similarity'] < self.fallback_similarity:
+            metrics.inc('fallback', 'result', 'miss')
+            return intents
+        metrics.inc('fallback', 'result', 'hit')
+        return [{'intent': nearest[0]['intent'], 'probability': str(nearest[0]['similarity']),
+                 'source': 'nearest_pattern', 'pattern': nearest[0]['pattern']}]
+
+    def explain(self, sentence, k=3):
+        # The model's ranking next to the k most similar stored patterns and
+        # the terms they share with the message.
+        text = normalize(sentence)
+        nearest = []
+        if self.pattern_index is not None:
+            nearest = self.pattern_index.nearest(self.vectorizer.transform([text]), k, explain=True)
+        return {
+            'normalized': text,
+            'model': self.predict_normalized_batch([text])[0],
+            'nearest_patterns': nearest,
+            'answer': self.predict_class(sentence)[0],
+        }
+
+    def stats(self):
+        stats = {
+            'startup': startup_report.as_dict(),
+            'preprocessing': preprocessing_stats(),
+            'model': {'version': self.model_version, 'quantization': getattr(self.model, 'quantization', None)},
+            'prediction_cache': self.cache.stats(),
+            'turns': self.turn_stats.as_dict(),
+        }
+        if self.scheduler is not None:
+            stats['scheduler'] = self.scheduler.stats()
+        if self.pool is not None:
+            stats['workers'] = self.pool.stats()
+        if metrics.enabled:
+            stats['metrics'] = metrics.as_dict()
+        return stats
+
+    def get_response(self, intents_list, user_data):
+        with metrics.span('response'):
+            return get_response(intents_list, self.responses, user_data)
+
+    def _reply(self, session, message):
+        session.add_message(Sender.BOT, message)
+        return message
+
+    def start(self, session):
+        session.reset()
+        session.chat_started = True
+        return [
+            self._reply(session, "Hey there, dreamer! I'm CareerVihari AI, your guide to unlocking an amazing career path! 🚀"),
+            self._reply(session, "I can't wait to get to know you better—what's your name? 🌟"),
+        ]
+
+    def prompt_stage(self, session):
+        replies = []
+        if session.conversation_state == 'stage_selection' and not session.stage_prompt_displayed:
+            name = session.user_data.get("name", "friend")
+            replies.append(self._reply(session, f"Thank you, {name}! Now, please select your educational stage:"))
+            session.stage_prompt_displayed = True
+        return replies
+
+    def select_stage(self, session, stage):
+        if session.conversation_state != 'stage_selection':
+            raise ValueError(f"Cannot select a stage in state '{session.conversation_state}'")
+        session.add_message(Sender.USER, stage)
+        session.user_data["stage"] = stage
+        if stage == "Post-10th":
+            session.conversation_state = 'post_10th'
+            message = f"Congrats on finishing 10th, {session.user_data['name']}! Do you know which group you want to take, or do you need help deciding?"
+        elif stage == "Post-12th":
+            session.conversation_state = 'post_12th'
+            message = "Congrats on finishing 12th! What’s your stream?"
+        elif stage == "Undergraduate":
+            session.conversation_state = 'undergraduate'
+            message = "Welcome, undergrad! What’s your major, and what year are you in?"
+            session.show_undergrad_form = True
+        elif stage == "Postgraduate":
+            session.conversation_state = 'postgraduate'
+            message = "You’re a postgraduate—impressive! What’s your field of study?"
+            session.show_postgrad_form = True
+        else:
+            raise ValueError(f"Unknown stage '{stage}', expected one of {STAGES}")
+        return [self._reply(session, message)]
+
+    def submit_undergrad(self, session, major, year):
+        if not (session.conversation_state == 'undergraduate' and session.show_undergrad_form) or not major:
+            return []
+        session.add_message(Sender.USER, f"{major}, {year}")
+        session.user_data["major"] = major
+        session.user_data["year"] = year
+        name = session.user_data.get("name", "friend")
+        session.conversation_state = 'awaiting_course_enjoyment_response'
+        session.show_undergrad_form = False
+        return [self._reply(session, f"Great to know, {name}! You’re a {year} {major} student. Are you enjoying your course?")]
+
+    def submit_postgrad(self, session, field):
+        if not (session.conversation_state == 'postgraduate' and session.show_postgrad_form) or not field:
+            return []
+        session.add_message(Sender.USER, field)
+        session.user_data["field"] = field
+        session.conversation_state = 'postgraduate_options'
+        session.show_postgrad_form = False
+        return [self._reply(session, f"Sweet, {field} it is! What’s on your mind—career or research? Check out [ResearchGate](https://www.researchgate.net) for research insights.")]
+
+    def handle_message(self, session, user_input):
+        session.add_message(Sender.USER, user_input)
+
+        metrics.inc('turns', 'state', session.conversation_state)
+        if user_input.lower() in END_WORDS:
+            session.ended = True
+            return [self._reply(session, "Goodbye! Have a great day!")]
+
+        with metrics.span('turn'):
+            bot_response = self._respond(session, user_input)
+            return [self._reply(session, bot_response)] + self.prompt_stage(session)
+
+    def _respond(self, session, user_input):
+        # The model runs only if a rule checks the intent or no rule replies,
+        # and then at most once.
+        state = session.conversation_state
+        turn = TurnClassification(self, user_input)
+        with metrics.span('dialogue'):
+            rule = self.dialogue.match(session, user_input, turn.intent)
+            reply = rule.apply(session, user_input) if rule is not None else None
+        if reply is None:
+            reply = turn.response(session.user_data)
+        self.turn_stats.record(state, turn.computed)
+        return reply
@@ -0,0 +1,233 @@
+import json
+import os
+
+import numpy as np
+
+BACKENDS = ('numpy', 'keras')
+DEFAULT_BACKEND = os.environ.get('CAREERVIHARI_BACKEND', 'numpy')
+QUANTIZATIONS = ('float16', 'int8')
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+def _linear(x):
+    return x
+
+
+def is_sparse(x):
+    # scipy sparse matrices, checked without importing scipy.
+    return hasattr(x, 'tocsr') and hasattr(x, 'nnz')
+
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'softmax': _softmax,
+    'linear': _linear,
+}
+
+
+class NumpyIntentModel:
+    # Forward pass of the trained Dense stack without TensorFlow. Dropout
+    # layers are identity at inference time, so only Dense layers are kept.
+    # Kernels may be float16, or int8 with a per-output-channel scale that is
+    # applied after the matrix product. Only the first kernel, which holds
+    # nearly all the weights, is used quantized; the small layers after it
+    # are widened to float32 once here rather than on every call.
+
+    def __init__(self, layers, scales=None):
+        self.layers = layers
+        self.scales = list(scales) if scales is not None else [None] * len(layers)
+        self._tail = [
+            (kernel.astype(np.float32, copy=False) * scale if scale is not None else kernel.astype(np.float32, copy=False),
+             bias, activation)
+            for (kernel, bias, activation), scale in zip(layers[1:], self.scales[1:])
+        ]
+
+    @classmethod
+    def from_h5(cls, path):
+        import h5py
+
+        with h5py.File(path, 'r') as f:
+            config = f.attrs['model_config']
+            if isinstance(config, bytes):
+                config = config.decode('utf-8')
+            config = json.loads(config)
+            weights = f['model_weights'] if 'model_weights' in f else f
+
+            layers = []
+            for layer in config['config']['layers']:
+                if layer['class_name'] != 'Dense':
+                    continue
+                name = layer['config']['name']
+                activation = layer['config'].get('activation', 'linear')
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation '{activation}' in layer {name}")
+                group = weights[name]
+                weight_names = [n.decode('utf-8') if isinstance(n, bytes) else n for n in group.attrs['weight_names']]
+                kernel = bias = None
+                for weight_name in weight_names:
+                    if weight_name.endswith('kernel') or weight_name.endswith('kernel:0'):
+                        kernel = np.asarray(group[weight_name], dtype=np.float32)
+                    elif weight_name.endswith('bias') or weight_name.endswith('bias:0'):
+                        bias = np.asarray(group[weight_name], dtype=np.float32)
+                if kernel is None:
+                    raise ValueError(f"No kernel found for layer {name}")
+                if bias is None:
+                    bias = np.zeros(kernel.shape[1], dtype=np.float32)
+                layers.append((kernel, bias, activation))
+
+        if not layers:
+            raise ValueError(f"No Dense layers found in {path}")
+        return cls(layers)
+
+    @property
+    def input_dim(self):
+        return self.layers[0][0].shape[0]
+
+    @property
+    def quantization(self):
+        dtype = self.layers[0][0].dtype
+        return None if dtype == np.float32 else dtype.name
+
+    def quantize(self, mode):
+        if mode not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{mode}', expected one of {QUANTIZATIONS}")
+        layers = []
+        scales = []
+        for kernel, bias, activation in self.layers:
+            if mode == 'float16':
+                layers.append((kernel.astype(np.float16), bias, activation))
+                scales.append(None)
+                continue
+            # Symmetric int8, one scale per output unit.
+            scale = np.abs(kernel).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            quantized = np.clip(np.rint(kernel / scale), -127, 127).astype(np.int8)
+            layers.append((quantized, bias, activation))
+            scales.append(scale.astype(np.float32))
+        return NumpyIntentModel(layers, scales)
+
+    def predict(self, x, verbose=0):
+        kernel, bias, activation = self.layers[0]
+        if is_sparse(x):
+            # TF-IDF rows stay sparse through the first layer, which then
+            # touches one kernel row per non-zero term; the first dense array
+            # is the hidden layer's output.
+            x = _sparse_dot(x.tocsr(), kernel)
+        else:
+            x = np.asarray(x, dtype=np.float32)
+            if x.ndim == 1:
+                x = x[np.newaxis, :]
+            x = x @ kernel
+        if self.scales[0] is not None:
+            x *= self.scales[0]
+        x += bias
+        x = ACTIVATIONS[activation](x)
+        for kernel, bias, activation in self._tail:
+            x = x @ kernel
+            x += bias
+            x = ACTIVATIONS[activation](x)
+        return x
+
+
+def _sparse_dot(x, kernel):
+    if x.shape[0] == 1:
+        # A single message: weighted sum of the kernel rows for its terms.
+        return (x.data.astype(np.float32) @ kernel[x.indices].astype(np.float32, copy=False))[np.newaxis, :]
+    return np.asarray(x.astype(np.float32) @ kernel, dtype=np.float32)
+
+
+class KerasIntentModel:
+    # Thin wrapper so the Keras model exposes the same predict() signature and
+    # TensorFlow is only imported when this backend is actually selected.
+
+    def __init__(self, path):
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+
+        self._tf = tf
+        self.model = load_model(path)
+        self.sparse_input = bool(getattr(self.model.inputs[0], 'sparse', False))
+
+    @property
+    def input_dim(self):
+        return self.model.input_shape[-1]
+
+    def predict(self, x, verbose=0):
+        if is_sparse(x):
+            x = to_sparse_tensor(self._tf, x) if self.sparse_input else x.toarray()
+        return self.model.predict(x, verbose=verbose)
+
+
+def to_sparse_tensor(tf, x):
+    x = x.tocoo()
+    indices = np.stack([x.row, x.col], axis=1).astype(np.int64)
+    return tf.sparse.reorder(tf.SparseTensor(indices, x.data.astype(np.float32), x.shape))
+
+
+def load_intent_model(path, backend=None):
+    backend = backend or DEFAULT_BACKEND
+    if backend == 'numpy':
+        return NumpyIntentModel.from_h5(path)
+    if backend == 'keras':
+        return KerasIntentModel(path)
+    raise ValueError(f"Unknown model backend '{backend}', expected one of {BACKENDS}")
+
+
+def quantization_report(model, quantized, X, labels):
+    # Accuracy of both models on X against labels, how often their top
+    # intent agrees, and the largest probability difference.
+    expected = model.predict(X)
+    actual = quantized.predict(X)
+    return {
+        'quantization': quantized.quantization,
+        'accuracy_float32': float(np.mean(expected.argmax(axis=1) == labels)),
+        'accuracy_quantized': float(np.mean(actual.argmax(axis=1) == labels)),
+        'top1_agreement': float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1))),
+        'max_abs_difference': float(np.max(np.abs(expected - actual))),
+        'kernel_bytes_float32': int(sum(kernel.nbytes for kernel, _, _ in model.layers)),
+        'kernel_bytes_quantized': int(sum(kernel.nbytes for kernel, _, _ in quantized.layers)),
+    }
+
+
+def compare_backends(path, inputs, atol=1e-5):
+    numpy_model = NumpyIntentModel.from_h5(path)
+    keras_model = KerasIntentModel(path)
+    expected = keras_model.predict(inputs)
+    actual = numpy_model.predict(inputs)
+    max_diff = float(np.max(np.abs(expected - actual)))
+    return max_diff, max_diff <= atol
+
+
+if __name__ == '__main__':
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Check the NumPy backend against Keras on the training patterns.")
+    parser.add_argument('--model', default='model_new.h5')
+    parser.add_argument('--vectorizer', default='vectorizer_new.pkl')
+    parser.add_argument('--intents', default='intent_new.json')
+    parser.add_argument('--atol', type=float, default=1e-5)
+    args = parser.parse_args()
+
+    with open(args.intents, 'r', encoding='utf-8') as file:
+        intents = json.load(file)
+    if isinstance(intents, dict):
+        intents = intents['intents']
+    patterns = [p.lower() for intent in intents for p in intent.get('patterns', [])]
+    vectorizer = pickle.load(open(args.vectorizer, 'rb'))
+    X = vectorizer.transform(patterns)
+
+    max_diff, ok = compare_backends(args.model, X, atol=args.atol)
+    print(f"Compared {len(patterns)} patterns, max abs difference: {max_diff:.2e}")
+    print("OK" if ok else "MISMATCH")
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmark import load_corpus
+from engine import STAGES, YEARS, ConversationEngine, ConversationSession
+from server import ChatServer
+
+NAMES = ('Ravi', 'Priya', 'Arjun', 'Sneha', 'Kiran', 'Anjali', 'Rahul', 'Divya', 'Vikram', 'Lakshmi')
+STREAMS = ('MPC', 'BIPC', 'Commerce')
+MAJORS = ('Computer Science', 'Mechanical Engineering', 'Commerce', 'Biotechnology', 'Physics')
+FIELDS = ('MBA', 'M.Tech', 'MSc Data Science', 'MA Economics')
+END = ('message', ('bye',))
+
+# One conversation per stage, following the buttons and forms the app shows.
+SCRIPTS = {
+    'post_10th': [
+        ('message', ('Ravi',)), ('message', ('ravi@example.com',)), ('stage', ('Post-10th',)),
+        ('message', ('I need help deciding',)), ('message', ('mpc',)), ('message', ('what exams should I write',)),
+        ('message', ('tell me about polycet',)), END,
+    ],
+    'post_12th': [
+        ('message', ('Priya',)), ('message', ('priya@example.com',)), ('stage', ('Post-12th',)),
+        ('message', ('BIPC',)), ('message', ('what careers can I choose',)), ('message', ('tell me about NEET',)), END,
+    ],
+    'undergraduate': [
+        ('message', ('Arjun',)), ('message', ('arjun@example.com',)), ('stage', ('Undergraduate',)),
+        ('undergrad', ('Computer Science', '2nd Year')), ('message', ('yes',)), ('message', ('internships for students',)),
+        ('message', ('how do I prepare for placements',)), END,
+    ],
+    'postgraduate': [
+        ('message', ('Sneha',)), ('message', ('sneha@example.com',)), ('stage', ('Postgraduate',)),
+        ('postgrad', ('MBA',)), ('message', ('career',)), ('message', ('jobs after MBA',)), END,
+    ],
+}
+
+
+def random_conversation(rng, questions, max_questions):
+    # Name, email and a random stage with its follow-up, then free-form
+    # questions drawn from the intent patterns, sometimes with a typo or an
+    # unrelated tail, and usually a goodbye.
+    name = rng.choice(NAMES)
+    steps = [('message', (name,)), ('message', (f"{name.lower()}{rng.randrange(1000)}@example.com",))]
+    stage = rng.choice(STAGES)
+    steps.append(('stage', (stage,)))
+    if stage == 'Post-10th':
+        steps += [('message', (rng.choice(('yes', 'I need help deciding')),)), ('message', (rng.choice(STREAMS),))]
+    elif stage == 'Post-12th':
+        steps.append(('message', (rng.choice(STREAMS),)))
+    elif stage == 'Undergraduate':
+        steps += [('undergrad', (rng.choice(MAJORS), rng.choice(YEARS))), ('message', (rng.choice(('yes', 'no')),))]
+    else:
+        steps.append(('postgrad', (rng.choice(FIELDS),)))
+    for _ in range(rng.randint(1, max_questions)):
+        question = rng.choice(questions)
+        roll = rng.random()
+        if roll < 0.1 and len(question) > 3:
+            i = rng.randrange(len(question) - 1)
+            question = question[:i] + question[i + 1] + question[i] + question[i + 2:]
+        elif roll < 0.2:
+            question = f"{question} {rng.choice(('please', 'asap', 'for my cousin', 'lol'))}"
+        steps.append(('message', (question,)))
+    if rng.random() < 0.9:
+        steps.append(END)
+    return steps
+
+
+class EngineClient:
+    # One virtual user talking to the engine directly, with turns on a thread
+    # pool as in server.py.
+
+    def __init__(self, engine, executor):
+        self.engine = engine
+        self.executor = executor
+        self.session = None
+        self.actions = {
+            'message': engine.handle_message,
+            'stage': engine.select_stage,
+            'undergrad': engine.submit_undergrad,
+            'postgrad': engine.submit_postgrad,
+        }
+
+    async def start(self):
+        self.session = ConversationSession()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.engine.start, self.session)
+        return self.session.conversation_state
+
+    async def send(self, kind, args):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.actions[kind], self.session, *args)
+        return self.session.conversation_state
+
+    @property
+    def ended(self):
+        return self.session.ended
+
+    async def close(self):
+        self.session = None
+
+
+class HttpClient:
+    # One virtual user on a keep-alive connection to the local server.
+    ROUTES = {
+        'message': ('messages', ('text',)),
+        'stage': ('stage', ('stage',)),
+        'undergrad': ('undergrad', ('major', 'year')),
+        'postgrad': ('postgrad', ('field',)),
+    }
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+        self.session_id = None
+        self.ended = False
+
+    async def _request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode('latin-1') + payload
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value.strip())
+        response = json.loads(await self.reader.readexactly(length)) if length else {}
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status}: {response.get('error', response)}")
+        return response
+
+    async def start(self):
+        response = await self._request('POST', '/sessions', {})
+        self.session_id = response['session_id']
+        self.ended = False
+        return response['session']['conversation_state']
+
+    async def send(self, kind, args):
+        route, keys = self.ROUTES[kind]
+        response = await self._request('POST', f"/sessions/{self.session_id}/{route}", dict(zip(keys, args)))
+        self.ended = response['session']['ended']
+        return response['session']['conversation_state']
+
+    async def close(self):
+        if self.session_id is not None and not self.ended:
+            await self._request('DELETE', f"/sessions/{self.session_id}")
+        self.session_id = None
+
+    async def disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = Counter()
+        self.turns = 0
+        self.conversations = 0
+
+    def record(self, state, seconds):
+        samples = self.latencies.get(state)
+        if samples is None:
+            samples = self.latencies[state] = array('d')
+        samples.append(seconds)
+        self.turns += 1
+
+    def summary(self):
+        states = {}
+        for state, samples in sorted(self.latencies.items(), key=lambda item: -len(item[1])):
+            values = np.frombuffer(samples, dtype=np.float64) * 1000.0
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            states[state] = {
+                'turns': len(values),
+                'mean_ms': round(float(values.mean()), 3),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(values.max()), 3),
+            }
+        return states
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        # Peak rather than current outside Linux.
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+async def virtual_user(make_client, recorder, rng, questions, args, deadline, budget):
+    client = make_client()
+    try:
+        while time.perf_counter() < deadline and budget.get('left', 1) > 0:
+            if 'left' in budget:
+                budget['left'] -= 1
+            if rng.random() < args.scripted:
+                steps = SCRIPTS[rng.choice(tuple(SCRIPTS))]
+            else:
+                steps = random_conversation(rng, questions, args.questions)
+            try:
+                started = time.perf_counter()
+                state = await client.start()
+                recorder.record('(start)', time.perf_counter() - started)
+                for kind, step_args in steps:
+                    started = time.perf_counter()
+                    next_state = await client.send(kind, step_args)
+                    recorder.record(state, time.perf_counter() - started)
+                    state = next_state
+                    if client.ended:
+                        # A free-form question can be a goodbye.
+                        break
+                    if args.think_ms > 0:
+                        await asyncio.sleep(rng.expovariate(1000.0 / args.think_ms))
+                await client.close()
+                recorder.conversations += 1
+            except Exception as e:
+                recorder.errors[f"{type(e).__name__}: {e}"[:200]] += 1
+    finally:
+        if isinstance(client, HttpClient):
+            await client.disconnect()
+
+
+async def sample_memory(recorder, samples, started, interval, live_sessions):
+    while True:
+        samples.append({
+            'elapsed_s': round(time.perf_counter() - started, 2),
+            'turns': recorder.turns,
+            'rss_mb': round(rss_mb(), 1),
+            'live_sessions': live_sessions(),
+        })
+        await asyncio.sleep(interval)
+
+
+async def run(args):
+    engine = ConversationEngine.from_files(args.backend, workers=args.processes)
+    questions = load_corpus()
+    executor = ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix='loadtest-turn')
+    server = listener = None
+    if args.mode == 'http':
+        # The real HTTP front end on an ephemeral local port, in this process.
+        server = ChatServer(engine, max_workers=args.threads, idle_seconds=0)
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        make_client = lambda: HttpClient('127.0.0.1', port)
+        live_sessions = lambda: len(server.sessions)
+    else:
+        clients = []
+
+        def make_client():
+            client = EngineClient(engine, executor)
+            clients.append(client)
+            return client
+
+        live_sessions = lambda: sum(client.session is not None for client in clients)
+
+    # One pass over the scripts first, so lazy imports and first-use caches
+    # are not counted as latency or memory growth.
+    warmup = make_client()
+    for steps in SCRIPTS.values():
+        await warmup.start()
+        for kind, step_args in steps:
+            await warmup.send(kind, step_args)
+        await warmup.close()
+    if isinstance(warmup, HttpClient):
+        await warmup.disconnect()
+
+    recorder = Recorder()
+    memory = []
+    budget = {'left': args.conversations} if args.conversations else {}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    sampler = asyncio.create_task(sample_memory(recorder, memory, started, args.sample_interval, live_sessions))
+    rngs = [random.Random(args.seed * 100003 + i) for i in range(args.users)]
+    await asyncio.gather(*(virtual_user(make_client, recorder, rng, questions, args, deadline, budget) for rng in rngs))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    memory.append({'elapsed_s': round(elapsed, 2), 'turns': recorder.turns, 'rss_mb': round(rss_mb(), 1),
+                   'live_sessions': live_sessions()})
+    if listener is not None:
+        listener.close()
+        await listener.wait_closed()
+    executor.shutdown()
+    if engine.pool is not None:
+        engine.pool.close()
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'mode': args.mode,
+            'users': args.users,
+            'threads': args.threads,
+            'processes': args.processes,
+            'scripted': args.scripted,
+            'think_ms': args.think_ms,
+            'seed': args.seed,
+            'model_version': engine.model_version,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'turns': recorder.turns,
+        'turns_per_s': round(recorder.turns / elapsed, 1),
+        'conversations': recorder.conversations,
+        'errors': dict(recorder.errors),
+        'states': recorder.summary(),
+        'memory': memory,
+        'rss_growth_mb': round(memory[-1]['rss_mb'] - memory[0]['rss_mb'], 1),
+    }
+
+
+def print_report(report):
+    print(f"\n{report['turns']} turns in {report['elapsed_s']:.1f} s: {report['turns_per_s']:.1f} turns/s, "
+          f"{report['conversations']} conversations, {sum(report['errors'].values())} errors "
+          f"({report['meta']['users']} users, {report['meta']['mode']} mode)")
+    print(f"\n{'state':<36} {'turns':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for state, s in report['states'].items():
+        print(f"{state:<36} {s['turns']:>8} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    print(f"\n{'elapsed s':>10} {'turns':>10} {'rss MB':>9} {'sessions':>9}")
+    for sample in report['memory']:
+        print(f"{sample['elapsed_s']:>10.1f} {sample['turns']:>10} {sample['rss_mb']:>9.1f} {sample['live_sessions']:>9}")
+    print(f"RSS growth: {report['rss_growth_mb']:+.1f} MB")
+    for error, n in report['errors'].items():
+        print(f"  {n:>6} x {error}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Drive many concurrent scripted and random conversations through the engine.")
+    parser.add_argument('--mode', choices=('engine', 'http'), default='engine',
+                        help="call the engine directly, or go through server.py on a local port")
+    parser.add_argument('--users', type=int, default=50, help="concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run")
+    parser.add_argument('--conversations', type=int, help="stop after this many conversations")
+    parser.add_argument('--scripted', type=float, default=0.25, help="fraction of conversations taken from the fixed scripts")
+    parser.add_argument('--questions', type=int, default=6, help="most free-form questions in a random conversation")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="mean pause between a user's turns")
+    parser.add_argument('--threads', type=int, default=32, help="threads running turns")
+    parser.add_argument('--processes', type=int, default=0, help="classification worker processes")
+    parser.add_argument('--backend', choices=('numpy', 'keras'))
+    parser.add_argument('--sample-interval', type=float, default=5.0, help="seconds between memory samples")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='loadtest.json', help="where to write the JSON results")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
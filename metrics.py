@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_ENABLED = os.environ.get('CAREERVIHARI_METRICS') == '1'
+METRICS_DUMP_PATH = os.environ.get('CAREERVIHARI_METRICS_DUMP')
+METRICS_DUMP_INTERVAL = float(os.environ.get('CAREERVIHARI_METRICS_DUMP_INTERVAL', '60'))
+PREFIX = 'careervihari'
+
+# Upper bounds in seconds, Prometheus-style; the last bucket is +Inf.
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('_metrics', '_stage', '_started')
+
+    def __init__(self, metrics, stage):
+        self._metrics = metrics
+        self._stage = stage
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._stage, time.perf_counter() - self._started)
+        return False
+
+
+class Metrics:
+    # Stage latency histograms and labelled counters for the turn path. While
+    # disabled, span() hands back a shared no-op context manager and the
+    # other methods return at once, so call sites can stay unconditional.
+
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._dump_thread = None
+        self.started_at = time.time()
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, label=None, value=None, amount=1):
+        # One optional label per counter, e.g. inc('turns', 'state', 'post_12th').
+        if not self.enabled:
+            return
+        key = (name, label, value)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    def as_dict(self):
+        with self._lock:
+            histograms = {stage: (list(h.counts), h.total, h.count, h) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        stages = {}
+        for stage, (counts, total, count, histogram) in sorted(histograms.items()):
+            stages[stage] = {
+                'count': count,
+                'mean_ms': total * 1000.0 / count if count else 0.0,
+                'p50_ms_le': histogram.quantile(0.5) * 1000.0,
+                'p95_ms_le': histogram.quantile(0.95) * 1000.0,
+                'p99_ms_le': histogram.quantile(0.99) * 1000.0,
+                'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], counts)),
+            }
+        grouped = {}
+        for (name, label, value), n in sorted(counters.items(), key=lambda item: tuple(str(k) for k in item[0])):
+            if label is None:
+                grouped[name] = n
+            else:
+                grouped.setdefault(name, {})[value] = n
+        intents = grouped.get('intents', {})
+        classified = sum(intents.values()) if isinstance(intents, dict) else 0
+        return {
+            'enabled': self.enabled,
+            'since': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started_at)),
+            'stages': stages,
+            'counters': grouped,
+            'unknown_rate': intents.get('unknown', 0) / classified if classified else 0.0,
+        }
+
+    def prometheus(self):
+        # Prometheus text exposition format (version 0.0.4).
+        with self._lock:
+            histograms = {stage: (list(h.counts), h.total, h.count) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = [
+            f'# HELP {PREFIX}_stage_seconds Time spent in each stage of a turn.',
+            f'# TYPE {PREFIX}_stage_seconds histogram',
+        ]
+        for stage, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, n in zip([repr(b) for b in BUCKETS] + ['+Inf'], counts):
+                cumulative += n
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{_escape(stage)}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{_escape(stage)}"}} {total!r}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{_escape(stage)}"}} {count}')
+        names = sorted({name for name, _, _ in counters})
+        for name in names:
+            lines.append(f'# TYPE {PREFIX}_{name}_total counter')
+            for (counter, label, value), n in sorted(counters.items(), key=lambda item: tuple(str(k) for k in item[0])):
+                if counter != name:
+                    continue
+                labels = f'{{{label}="{_escape(str(value))}"}}' if label is not None else ''
+                lines.append(f'{PREFIX}_{name}_total{labels} {n}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_dump(self, path=METRICS_DUMP_PATH, interval=METRICS_DUMP_INTERVAL):
+        # Writes as_dict() to path every interval seconds from a daemon thread.
+        if not self.enabled or not path or self._dump_thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    print(f"Could not write metrics to {path}: {e}")
+
+        self._dump_thread = threading.Thread(target=loop, name='metrics-dump', daemon=True)
+        self._dump_thread.start()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
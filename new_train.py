@@ -1,157 +1,438 @@
+import argparse
+import hashlib
 import json
+import os
 import pickle
+import random
+import time
+from contextlib import contextmanager
+
 import numpy as np
-import nltk
-from nltk.stem import WordNetLemmatizer
 from sklearn.feature_extraction.text import TfidfVectorizer
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
-from tensorflow.keras.optimizers import SGD
-import random
 
-# Download required NLTK data
-nltk.download('punkt')
-nltk.download('wordnet')
-
-# Initialize lemmatizer
-lemmatizer = WordNetLemmatizer()
-
-# Load the new intents file with error handling
-try:
-    with open('intent_new.json', 'r') as file:
-        data = file.read()
-        if not data.strip():  # Check if file is empty
-            raise ValueError("intent_new.json is empty!")
-        # First attempt to parse as JSON
-        intents = json.loads(data)
-    print("JSON file loaded successfully!")
-except json.JSONDecodeError as e:
-    print(f"Error parsing JSON: {e}")
-    print("Please check the syntax of intent_new.json.")
-    exit(1)
-except ValueError as e:
-    print(f"Error: {e}")
-    exit(1)
-
-# Check the type of intents and handle different structures
-print("Type of intents:", type(intents))
-if isinstance(intents, str):
-    # If intents is a string, parse it again
+from bundle import BUNDLE_PATH, export_quantized, file_sha256, write_bundle
+from corpus import COMPILED_PATH, compile_intents, read_intents, validate_intents, write_compiled
+from inference import QUANTIZATIONS, NumpyIntentModel, to_sparse_tensor
+from pattern_index import PatternIndex
+from preprocessing import IGNORE_WORDS, ensure_nltk_resources, lemmatize, tokenize, stats as preprocessing_stats
+from workers import available_cpus
+
+# Hyperparameters for each mode; command-line flags override them.
+# 'legacy' is the original recipe, 'fast' stops once held-out loss stalls.
+PRESETS = {
+    'legacy': {'optimizer': 'sgd', 'epochs': 200, 'batch_size': 5, 'validation_split': 0.0, 'patience': 0},
+    'fast': {'optimizer': 'adam', 'epochs': 200, 'batch_size': 32, 'validation_split': 0.1, 'patience': 8},
+}
+# Epoch budget when training starts from the previous model's weights.
+WARM_EPOCHS = {'legacy': 20, 'fast': 50}
+# Hidden Dense layer widths and TF-IDF vocabulary size; sweep.py searches
+# over both.
+HIDDEN_LAYERS = (128, 64)
+MAX_FEATURES = 5000
+
+# Preprocessed patterns per intent, keyed by a hash of its tag and patterns,
+# plus a fingerprint of what the current model was trained on.
+TRAIN_CACHE = os.environ.get('CAREERVIHARI_TRAIN_CACHE', 'train_cache.pkl')
+TRAIN_CACHE_VERSION = 1
+ARTIFACTS = ('words_new.pkl', 'classes_new.pkl', 'vectorizer_new.pkl', 'model_new.h5')
+
+phases = []
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
     try:
-        intents = json.loads(intents)
-        print("Parsed string into JSON object.")
-    except json.JSONDecodeError as e:
-        print(f"Error parsing string as JSON: {e}")
-        print("intent_new.json contains a string that is not valid JSON.")
-        exit(1)
-elif isinstance(intents, dict):
-    # If intents is a dictionary, check for a nested 'intents' key
-    if 'intents' in intents:
-        intents = intents['intents']
-        print("Found nested 'intents' key, using that list.")
-    else:
-        print("intent_new.json is a dictionary but does not contain an 'intents' key.")
-        exit(1)
-elif not isinstance(intents, list):
-    print(f"Unexpected type for intents: {type(intents)}. Expected a list.")
-    exit(1)
-
-# Verify that intents is a list of dictionaries
-if not intents:
-    print("intents list is empty!")
-    exit(1)
-
-# Initialize lists for words, classes, and training data
-words = []
-classes = []
-documents = []
-ignore_words = ['?', '!', '.', ',']
-
-# Process each intent
-for intent in intents:
-    # Check the type of intent
-    if not isinstance(intent, dict):
-        print(f"Error: Expected intent to be a dictionary, but got {type(intent)}: {intent}")
-        exit(1)
-    # Check if 'patterns' key exists
-    if 'patterns' not in intent:
-        print(f"Error: Intent is missing 'patterns' key: {intent}")
+        yield
+    finally:
+        phases.append((name, time.perf_counter() - started))
+
+
+def load_intents(path='intent_new.json'):
+    # The same checks as python corpus.py; errors stop training.
+    try:
+        intents = read_intents(path)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Could not read {path}: {e}")
         exit(1)
-    # Check if 'tag' key exists
-    if 'tag' not in intent:
-        print(f"Error: Intent is missing 'tag' key: {intent}")
+    issues = validate_intents(intents)
+    errors = [issue for issue in issues if issue.level == 'error']
+    for issue in errors:
+        print(issue)
+    if errors:
+        print(f"{path} has {len(errors)} errors; fix them and rerun.")
         exit(1)
+    if issues:
+        print(f"{path}: {len(issues)} warnings; run python corpus.py --check to list them.")
+    return intents
+
+
+def intent_hash(intent):
+    # Responses are left out: editing them never changes the model.
+    key = json.dumps([intent['tag'], intent['patterns']], ensure_ascii=False)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def preprocess_intent(intent):
+    # (tokens, lemmas) for each pattern of one intent.
+    documents = []
     for pattern in intent['patterns']:
-        # Tokenize each pattern
-        word_list = nltk.word_tokenize(pattern)
-        words.extend(word_list)
-        # Add to documents (pattern, intent tag)
-        documents.append((word_list, intent['tag']))
-        # Add intent tag to classes if not already present
-        if intent['tag'] not in classes:
-            classes.append(intent['tag'])
-
-# Lemmatize words and remove duplicates
-words = [lemmatizer.lemmatize(w.lower()) for w in words if w not in ignore_words]
-words = sorted(list(set(words)))
-
-# Sort classes
-classes = sorted(list(set(classes)))
-
-# Save words and classes to new .pkl files
-with open('words_new.pkl', 'wb') as f:
-    pickle.dump(words, f)
-
-with open('classes_new.pkl', 'wb') as f:
-    pickle.dump(classes, f)
-
-# Create training data
-training = []
-output_empty = [0] * len(classes)
-
-# Vectorize patterns using TF-IDF
-patterns = [' '.join([lemmatizer.lemmatize(word.lower()) for word in doc]) for doc, _ in documents]
-vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
-X = vectorizer.fit_transform(patterns).toarray()
-
-# Save the vectorizer
-with open('vectorizer_new.pkl', 'wb') as f:
-    pickle.dump(vectorizer, f)
-
-# Create labels (one-hot encoded)
-y = []
-for doc, tag in documents:
-    output_row = list(output_empty)
-    output_row[classes.index(tag)] = 1
-    y.append(output_row)
-
-# Convert to numpy arrays
-X = np.array(X)
-y = np.array(y)
-
-# Shuffle the data
-combined = list(zip(X, y))
-random.shuffle(combined)
-X, y = zip(*combined)
-X = np.array(X)
-y = np.array(y)
-
-# Build a simple neural network model
-model = Sequential()
-model.add(Dense(128, input_shape=(X.shape[1],), activation='relu'))
-model.add(Dropout(0.5))
-model.add(Dense(64, activation='relu'))
-model.add(Dropout(0.5))
-model.add(Dense(len(classes), activation='softmax'))
-
-# Compile the model
-sgd = SGD(learning_rate=0.01, decay=1e-6, momentum=0.9, nesterov=True)
-model.compile(loss='categorical_crossentropy', optimizer=sgd, metrics=['accuracy'])
-
-# Train the model
-model.fit(X, y, epochs=200, batch_size=5, verbose=1)
-
-# Save the model
-model.save('model_new.h5')
-
-print("Training completed! New .pkl files and model saved as: words_new.pkl, classes_new.pkl, vectorizer_new.pkl, and model_new.h5")
\ No newline at end of file
+        word_list, _ = tokenize(pattern)
+        documents.append((word_list, [lemmatize(word.lower()) for word in word_list]))
+    return documents
+
+
+def empty_train_cache():
+    return {'version': TRAIN_CACHE_VERSION, 'intents': {}, 'fingerprint': None, 'model_sha256': None}
+
+
+def load_train_cache(path=TRAIN_CACHE):
+    try:
+        with open(path, 'rb') as f:
+            cache = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return empty_train_cache()
+    if not isinstance(cache, dict) or cache.get('version') != TRAIN_CACHE_VERSION:
+        return empty_train_cache()
+    return cache
+
+
+def save_train_cache(cache, path=TRAIN_CACHE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def build_corpus(intents, cache=None):
+    # Returns the lemmatized vocabulary, sorted class list, one (tokens, tag)
+    # document per pattern, the lemmatized pattern texts, and how many
+    # intents were taken from the cache. Only intents whose tag or patterns
+    # changed since the cache was written are tokenized and lemmatized again.
+    cached = cache['intents'] if cache is not None else {}
+    fresh = {}
+    words = set()
+    classes = set()
+    documents = []
+    patterns = []
+    reused = 0
+    for intent in intents:
+        key = intent_hash(intent)
+        if key not in fresh:
+            if key in cached:
+                fresh[key] = cached[key]
+                reused += 1
+            else:
+                fresh[key] = preprocess_intent(intent)
+        for word_list, lemmas in fresh[key]:
+            words.update(lemma for word, lemma in zip(word_list, lemmas) if word not in IGNORE_WORDS)
+            documents.append((word_list, intent['tag']))
+            patterns.append(' '.join(lemmas))
+        classes.add(intent['tag'])
+
+    if cache is not None:
+        cache['intents'] = fresh
+    return sorted(words), sorted(classes), documents, patterns, reused
+
+
+def build_pattern_index(intents, documents, patterns, vectorizer, classes):
+    # Nearest-pattern lookup for low-confidence turns, stored in the bundle.
+    texts = [pattern for intent in intents for pattern in intent['patterns']]
+    return PatternIndex.build(vectorizer, patterns, texts, [tag for _, tag in documents], classes)
+
+
+def write_serving_bundles(args, words, classes, vectorizer, intents, documents, patterns):
+    # The float32 bundle, plus a quantized copy per --quantize mode, and the
+    # compiled intents for the Keras backend.
+    layers = NumpyIntentModel.from_h5('model_new.h5').layers
+    sources = {'intents_sha256': file_sha256('intent_new.json')}
+    write_compiled(compile_intents(intents, sources['intents_sha256']), COMPILED_PATH)
+    index = build_pattern_index(intents, documents, patterns, vectorizer, classes)
+    bundle_id = write_bundle(BUNDLE_PATH, words, classes, vectorizer, layers, intents, sources, index)
+    if args.quantize:
+        labels, _ = one_hot_labels(documents, classes)
+        export_quantized(BUNDLE_PATH, args.quantize, words, classes, vectorizer, layers, intents,
+                         vectorizer.transform(patterns), labels, sources, index)
+    return bundle_id
+
+
+def one_hot_labels(documents, classes):
+    class_index = {tag: i for i, tag in enumerate(classes)}
+    labels = np.fromiter((class_index[tag] for _, tag in documents), dtype=np.int64, count=len(documents))
+    return labels, np.eye(len(classes), dtype=np.float32)[labels]
+
+
+def split_holdout(labels, fraction, rng):
+    # Per-class split so every intent keeps at least one training pattern.
+    if fraction <= 0:
+        return np.arange(len(labels)), np.arange(0)
+    held_out = []
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        count = min(int(round(len(rows) * fraction)), len(rows) - 1)
+        if count > 0:
+            held_out.extend(rng.choice(rows, count, replace=False))
+    held_out = np.sort(np.asarray(held_out, dtype=np.int64))
+    mask = np.ones(len(labels), dtype=bool)
+    mask[held_out] = False
+    return np.flatnonzero(mask), held_out
+
+
+def configure_tensorflow(seed, threads):
+    import tensorflow as tf
+
+    # threads sizes each op's pool; the model is a chain of ops, so at most
+    # two run side by side and a larger inter-op pool only oversubscribes.
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(min(threads, 2))
+    tf.random.set_seed(seed)
+    if hasattr(tf.config.experimental, 'enable_op_determinism'):
+        tf.config.experimental.enable_op_determinism()
+    return tf
+
+
+def make_batches(tf, X, y, batch_size, rng=None, sparse=True):
+    # Keeps the TF-IDF matrix in CSR form and feeds each batch as a
+    # SparseTensor (or densifies it, with sparse=False), reshuffling row order
+    # each epoch when given a seeded generator.
+
+    class CsrBatches(tf.keras.utils.Sequence):
+        def __init__(self):
+            super().__init__()
+            self.order = rng.permutation(X.shape[0]) if rng is not None else np.arange(X.shape[0])
+
+        def __len__(self):
+            return -(-X.shape[0] // batch_size)
+
+        def __getitem__(self, index):
+            rows = self.order[index * batch_size:(index + 1) * batch_size]
+            batch = to_sparse_tensor(tf, X[rows]) if sparse else X[rows].toarray()
+            return (batch, y[rows]) if y is not None else (batch,)
+
+        def on_epoch_end(self):
+            if rng is not None:
+                self.order = rng.permutation(X.shape[0])
+
+    return CsrBatches()
+
+
+def build_model(tf, input_dim, n_classes, optimizer, sparse=True, hidden=HIDDEN_LAYERS):
+    from tensorflow.keras.layers import Dense, Dropout, Input
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.optimizers import SGD, Adam
+
+    # Build a simple neural network model. With a sparse input the first
+    # Dense layer is a sparse-dense matmul over the non-zero TF-IDF terms.
+    model = Sequential()
+    model.add(Input(shape=(input_dim,), sparse=sparse))
+    for units in hidden:
+        model.add(Dense(units, activation='relu'))
+        model.add(Dropout(0.5))
+    model.add(Dense(n_classes, activation='softmax'))
+
+    if optimizer == 'sgd':
+        opt = SGD(learning_rate=0.01, decay=1e-6, momentum=0.9, nesterov=True)
+    else:
+        opt = Adam(learning_rate=0.001)
+    model.compile(loss='categorical_crossentropy', optimizer=opt, metrics=['accuracy'])
+    return model
+
+
+def warm_start(model, previous_layers, previous_vocabulary, vocabulary):
+    # Copies the previous model's weights into a freshly built one. First
+    # layer kernel rows follow their terms into the new vocabulary; rows for
+    # new terms keep their fresh initialisation.
+    from tensorflow.keras.layers import Dense
+
+    dense = [layer for layer in model.layers if isinstance(layer, Dense)]
+    if len(dense) != len(previous_layers):
+        return False
+    weights = [layer.get_weights() for layer in dense]
+    for (kernel, bias), (old_kernel, old_bias, _) in zip(weights[1:], previous_layers[1:]):
+        if kernel.shape != old_kernel.shape or bias.shape != old_bias.shape:
+            return False
+    kernel, bias = weights[0]
+    old_kernel, old_bias, _ = previous_layers[0]
+    if kernel.shape[1] != old_kernel.shape[1]:
+        return False
+    moved = [(index, previous_vocabulary[term]) for term, index in vocabulary.items() if term in previous_vocabulary]
+    if moved:
+        new_rows, old_rows = (np.asarray(rows) for rows in zip(*moved))
+        kernel[new_rows] = old_kernel[old_rows]
+    dense[0].set_weights([kernel, np.array(old_bias)])
+    for layer, (old_kernel, old_bias, _) in zip(dense[1:], previous_layers[1:]):
+        layer.set_weights([np.array(old_kernel), np.array(old_bias)])
+    return True
+
+
+def load_previous_model(classes):
+    # The last trained layers and vocabulary, if they were trained on the
+    # same class list.
+    if not all(os.path.exists(path) for path in ARTIFACTS):
+        return None
+    with open('classes_new.pkl', 'rb') as f:
+        if pickle.load(f) != classes:
+            return None
+    with open('vectorizer_new.pkl', 'rb') as f:
+        vocabulary = pickle.load(f).vocabulary_
+    return NumpyIntentModel.from_h5('model_new.h5').layers, vocabulary
+
+
+def training_fingerprint(intents, args):
+    settings = {k: v for k, v in vars(args).items() if k not in ('verbose', 'threads', 'full', 'warm_epochs', 'quantize')}
+    key = json.dumps([[intent_hash(intent) for intent in intents], settings], sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def print_timing():
+    print("Timing:")
+    for name, seconds in phases:
+        print(f"  {name:<16} {seconds:8.2f} s")
+    print(f"  {'total':<16} {sum(seconds for _, seconds in phases):8.2f} s")
+
+
+def accuracy(tf, model, X, labels, sparse=True):
+    if X.shape[0] == 0:
+        return None
+    probs = model.predict(make_batches(tf, X, None, 256, sparse=sparse), verbose=0)
+    return float(np.mean(np.argmax(probs, axis=1) == labels))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the intent model and write the serving artifacts.")
+    parser.add_argument('--fast', action='store_true', help="Adam, larger batches, held-out split and early stopping")
+    parser.add_argument('--epochs', type=int)
+    parser.add_argument('--hidden', type=int, nargs='+', default=list(HIDDEN_LAYERS), help="hidden layer widths")
+    parser.add_argument('--max-features', type=int, default=MAX_FEATURES, help="TF-IDF vocabulary size")
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--validation-split', type=float, help="fraction of each intent's patterns held out")
+    parser.add_argument('--patience', type=int, help="epochs without held-out improvement before stopping (0 = off)")
+    parser.add_argument('--refit', action='store_true', help="retrain on all patterns for the best epoch count")
+    parser.add_argument('--dense-batches', action='store_true', help="densify each batch instead of a sparse first layer")
+    parser.add_argument('--warm-epochs', type=int, help="most epochs when warm-starting from the previous model")
+    parser.add_argument('--full', action='store_true', help="ignore the preprocessing cache and train from scratch")
+    parser.add_argument('--seed', type=int, default=int(os.environ.get('CAREERVIHARI_SEED', '42')))
+    parser.add_argument('--threads', type=int, default=available_cpus(),
+                        help="TensorFlow threads within each op (default: CPUs this process may use)")
+    parser.add_argument('--verbose', type=int, default=1)
+    parser.add_argument('--quantize', nargs='+', choices=QUANTIZATIONS, default=[],
+                        help="also export float16 and/or int8 bundles and report their accuracy")
+    args = parser.parse_args(argv)
+    for key, value in PRESETS['fast' if args.fast else 'legacy'].items():
+        if getattr(args, key, None) is None:
+            setattr(args, key, value)
+    if args.warm_epochs is None:
+        args.warm_epochs = WARM_EPOCHS['fast' if args.fast else 'legacy']
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sparse = not args.dense_batches
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+
+    # Check the NLTK data locally; set CAREERVIHARI_NLTK_DOWNLOAD=1 to fetch it
+    missing = ensure_nltk_resources()
+    if missing:
+        print(f"Missing NLTK data: {', '.join(missing)}. Install it or rerun with CAREERVIHARI_NLTK_DOWNLOAD=1.")
+        exit(1)
+
+    with phase('load intents'):
+        intents = load_intents()
+
+    cache = load_train_cache() if not args.full else empty_train_cache()
+    with phase('preprocess'):
+        words, classes, documents, patterns, reused = build_corpus(intents, cache)
+    print(f"Preprocessed {len(cache['intents']) - reused} changed intents, reused {reused} from {TRAIN_CACHE}")
+    print("Lemma cache:", preprocessing_stats()['lemma_cache'])
+
+    fingerprint = training_fingerprint(intents, args)
+    if (not args.full and fingerprint == cache['fingerprint'] and all(os.path.exists(path) for path in ARTIFACTS)
+            and file_sha256('model_new.h5') == cache['model_sha256']):
+        # Same tags and patterns as the current model: only responses changed.
+        with phase('bundle'):
+            with open('vectorizer_new.pkl', 'rb') as f:
+                vectorizer = pickle.load(f)
+            bundle_id = write_serving_bundles(args, words, classes, vectorizer, intents, documents, patterns)
+        save_train_cache(cache)
+        print(f"Patterns unchanged; no retraining needed. Rewrote {BUNDLE_PATH} (bundle {bundle_id}) with the current responses.")
+        print_timing()
+        return
+
+    previous = load_previous_model(classes) if not args.full else None
+
+    with phase('vectorize'):
+        vectorizer = TfidfVectorizer(max_features=args.max_features, stop_words='english')
+        X = vectorizer.fit_transform(patterns).astype(np.float32).tocsr()
+        labels, y = one_hot_labels(documents, classes)
+        train_rows, holdout_rows = split_holdout(labels, args.validation_split, rng)
+
+    with phase('tensorflow'):
+        tf = configure_tensorflow(args.seed, args.threads)
+        model = build_model(tf, X.shape[1], len(classes), args.optimizer, sparse, args.hidden)
+        warm = previous is not None and warm_start(model, previous[0], previous[1], vectorizer.vocabulary_)
+    # The warm-start budget caps the epoch count; it never raises it.
+    epochs = min(args.epochs, args.warm_epochs) if warm else args.epochs
+    print(f"Warm-starting from the previous model, {epochs} epochs (--epochs {args.epochs}, --warm-epochs {args.warm_epochs})."
+          if warm else f"Training from scratch, {epochs} epochs.")
+
+    callbacks = []
+    validation = None
+    if len(holdout_rows):
+        validation = make_batches(tf, X[holdout_rows], y[holdout_rows], 256, sparse=sparse)
+        if args.patience > 0:
+            callbacks.append(tf.keras.callbacks.EarlyStopping(
+                monitor='val_loss', patience=args.patience, restore_best_weights=True))
+
+    with phase('train'):
+        history = model.fit(make_batches(tf, X[train_rows], y[train_rows], args.batch_size, rng, sparse),
+                            validation_data=validation, epochs=epochs, callbacks=callbacks,
+                            shuffle=False, verbose=args.verbose)
+    epochs_run = len(history.history['loss'])
+    best_epoch = epochs_run
+    if callbacks and callbacks[0].stopped_epoch:
+        best_epoch = int(np.argmin(history.history['val_loss'])) + 1
+
+    if args.refit and len(holdout_rows):
+        with phase('refit'):
+            tf.random.set_seed(args.seed)
+            model = build_model(tf, X.shape[1], len(classes), args.optimizer, sparse, args.hidden)
+            if warm:
+                warm_start(model, previous[0], previous[1], vectorizer.vocabulary_)
+            model.fit(make_batches(tf, X, y, args.batch_size, rng, sparse), epochs=best_epoch, shuffle=False, verbose=args.verbose)
+
+    with phase('evaluate'):
+        train_accuracy = accuracy(tf, model, X[train_rows], labels[train_rows], sparse)
+        holdout_accuracy = accuracy(tf, model, X[holdout_rows], labels[holdout_rows], sparse)
+        all_accuracy = accuracy(tf, model, X, labels, sparse)
+
+    with phase('save'):
+        # Save words, classes, vectorizer and model
+        with open('words_new.pkl', 'wb') as f:
+            pickle.dump(words, f)
+        with open('classes_new.pkl', 'wb') as f:
+            pickle.dump(classes, f)
+        with open('vectorizer_new.pkl', 'wb') as f:
+            pickle.dump(vectorizer, f)
+        model.save('model_new.h5')
+        # Write the single memory-mappable bundle used for serving
+        bundle_id = write_serving_bundles(args, words, classes, vectorizer, intents, documents, patterns)
+        cache['fingerprint'] = fingerprint
+        cache['model_sha256'] = file_sha256('model_new.h5')
+        save_train_cache(cache)
+
+    print(f"Training completed! New .pkl files and model saved as: words_new.pkl, classes_new.pkl, vectorizer_new.pkl, model_new.h5 and {BUNDLE_PATH} (bundle {bundle_id})")
+    print(f"Mode: {'fast' if args.fast else 'legacy'}{' (warm start)' if warm else ''}, seed {args.seed}, {args.threads} threads, "
+          f"{len(train_rows)} training / {len(holdout_rows)} held-out patterns, "
+          f"{epochs_run} epochs run (best {best_epoch})")
+    print_timing()
+    print(f"Accuracy: training {train_accuracy:.4f}", end='')
+    if holdout_accuracy is not None:
+        print(f", held-out {holdout_accuracy:.4f}", end='')
+    print(f", all patterns {all_accuracy:.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Arrays stored in the model bundle, by name.
+ARRAYS = ('patterns.indptr', 'patterns.indices', 'patterns.data', 'patterns.tags')
+
+
+class PatternIndex:
+    # Every training pattern as an L2-normalized TF-IDF row, stored by term
+    # (CSC): for each vocabulary term, the patterns containing it and their
+    # weights. A lookup only visits the posting lists of the query's terms,
+    # so its cost follows the query's non-zeros, not the number of patterns.
+
+    def __init__(self, indptr, indices, data, tags, texts, classes, vocabulary=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.tags = tags
+        self.texts = texts
+        self.classes = classes
+        self.vocabulary = vocabulary
+        self._terms = None
+
+    @classmethod
+    def build(cls, vectorizer, normalized, texts, tags, classes):
+        # normalized: pattern texts as the model was trained on them;
+        # texts: the original patterns, kept for explanations.
+        rows = vectorizer.transform(normalized).astype(np.float32)
+        norms = np.sqrt(np.asarray(rows.multiply(rows).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        rows = rows.multiply(1.0 / norms[:, None]).tocsc()
+        rows.sort_indices()
+        class_index = {tag: i for i, tag in enumerate(classes)}
+        return cls(
+            np.ascontiguousarray(rows.indptr, dtype='<i4'),
+            np.ascontiguousarray(rows.indices, dtype='<i4'),
+            np.ascontiguousarray(rows.data, dtype='<f4'),
+            np.array([class_index[tag] for tag in tags], dtype='<i4'),
+            list(texts),
+            list(classes),
+            vectorizer.vocabulary_,
+        )
+
+    def arrays(self):
+        return dict(zip(ARRAYS, (self.indptr, self.indices, self.data, self.tags)))
+
+    def __len__(self):
+        return len(self.tags)
+
+    def nearest(self, vector, k=3, explain=False):
+        # vector: one TF-IDF row (CSR) from the serving vectorizer. Returns up
+        # to k dicts with the pattern, its intent and the cosine similarity,
+        # plus the shared terms and their contributions when explain is set.
+        cols = vector.indices
+        if not len(cols):
+            return []
+        weights = vector.data
+        norm = np.sqrt(np.dot(weights, weights))
+        starts = self.indptr[cols]
+        ends = self.indptr[cols + 1]
+        patterns = np.concatenate([self.indices[s:e] for s, e in zip(starts, ends)])
+        if not len(patterns):
+            return []
+        contributions = np.concatenate([self.data[s:e] * (w / norm) for s, e, w in zip(starts, ends, weights)])
+        candidates, inverse = np.unique(patterns, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+        k = min(k, len(candidates))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        results = []
+        for i in top:
+            pattern = int(candidates[i])
+            result = {
+                'intent': self.classes[self.tags[pattern]],
+                'pattern': self.texts[pattern],
+                'similarity': round(float(scores[i]), 6),
+            }
+            if explain:
+                result['terms'] = self._shared_terms(pattern, cols, ends - starts, patterns, contributions)
+            results.append(result)
+        return results
+
+    def _shared_terms(self, pattern, cols, lengths, patterns, contributions):
+        if self._terms is None:
+            self._terms = {index: term for term, index in (self.vocabulary or {}).items()}
+        term_of_posting = np.repeat(cols, lengths)
+        mask = patterns == pattern
+        shared = sorted(zip(term_of_posting[mask], contributions[mask]), key=lambda item: item[1], reverse=True)
+        return [{'term': self._terms.get(int(col), str(col)), 'contribution': round(float(c), 6)} for col, c in shared]
@@ -0,0 +1,243 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+IGNORE_WORDS = ['?', '!', '.', ',']
+LEMMA_CACHE_SIZE = int(os.environ.get('CAREERVIHARI_LEMMA_CACHE_SIZE', '50000'))
+NLTK_DOWNLOAD = os.environ.get('CAREERVIHARI_NLTK_DOWNLOAD') == '1'
+
+# resource name -> paths nltk.data.find accepts for it
+NLTK_RESOURCES = {
+    'punkt': ('tokenizers/punkt',),
+    'punkt_tab': ('tokenizers/punkt_tab',),
+    'wordnet': ('corpora/wordnet', 'corpora/wordnet.zip'),
+}
+
+_available = {}
+_nltk = None
+
+
+def _import_nltk():
+    # NLTK is only imported the first time a message needs it (the slow
+    # tokenizer path or a lemma cache miss); importing it costs seconds.
+    global _nltk
+    if _nltk is None:
+        import nltk
+        _nltk = nltk
+        if not _available:
+            ensure_nltk_resources()
+    return _nltk
+
+
+def _has_resource(name):
+    import nltk
+
+    for path in NLTK_RESOURCES[name]:
+        try:
+            nltk.data.find(path)
+            return True
+        except LookupError:
+            continue
+    return False
+
+
+def _sentence_model(nltk):
+    # NLTK 3.8.2 replaced the pickled punkt model that word_tokenize loads
+    # with punkt_tab, so check the one the installed version reads.
+    return 'punkt_tab' if hasattr(nltk.tokenize, 'PunktTokenizer') else 'punkt'
+
+
+def ensure_nltk_resources(download=NLTK_DOWNLOAD):
+    # Checks the local NLTK data only; the network is touched only when
+    # downloading was asked for. Returns the resources that are still missing.
+    import nltk
+
+    missing = []
+    for name in (_sentence_model(nltk), 'wordnet'):
+        available = _has_resource(name)
+        if not available and download:
+            nltk.download(name, quiet=True)
+            available = _has_resource(name)
+        _available[name] = available
+        if not available:
+            missing.append(name)
+    return missing
+
+# Plain ASCII words, spaces, commas, ? and ! with at most one trailing period.
+# For these nltk.word_tokenize reduces to splitting off punctuation, plus the
+# handful of whole-word contractions below. Anything else (apostrophes,
+# quotes, inner periods, "1,000", ",,") goes through NLTK.
+_FAST_PATH_RE = re.compile(r"[A-Za-z0-9 ,?!]*(?:\.[ ]*)?")
+_FAST_TOKEN_RE = re.compile(r"[A-Za-z0-9]+|[,?!.]")
+_SLOW_COMMA_RE = re.compile(r",[0-9,]")
+_SPLIT_WORDS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+
+def _fast_tokenize(sentence):
+    tokens = []
+    for token in _FAST_TOKEN_RE.findall(sentence):
+        split = _SPLIT_WORDS.get(token.lower())
+        if split:
+            tokens.append(token[:len(split[0])])
+            tokens.append(token[len(split[0]):])
+        else:
+            tokens.append(token)
+    return tokens
+
+
+class LemmaCache:
+    # Bounded LRU in front of WordNetLemmatizer. WordNet is only touched on a
+    # miss, so a cache seeded with the training vocabulary serves most turns
+    # without loading it at all.
+
+    def __init__(self, maxsize=LEMMA_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._lemmatizer = None
+        self.wordnet_missing = False
+        self.hits = 0
+        self.misses = 0
+
+    def seed(self, words, lemmas=None):
+        # Vocabulary entries are lemmas, but lemmatizing a lemma does not
+        # always return it ('data' -> 'datum', 'as' -> 'a'). lemmas maps the
+        # words that change, as recorded at training time; without it every
+        # word is lemmatized here, which loads WordNet.
+        if lemmas is None:
+            lemmas = changed_lemmas(words, self)
+        with self._lock:
+            for word in words:
+                self._data[word] = lemmas.get(word, word)
+                self._data.move_to_end(word)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def lemmatize(self, word):
+        with self._lock:
+            lemma = self._data.get(word)
+            if lemma is not None:
+                self._data.move_to_end(word)
+                self.hits += 1
+                return lemma
+        lemma = self._lemmatize_uncached(word)
+        with self._lock:
+            self.misses += 1
+            self._data[word] = lemma
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return lemma
+
+    def _lemmatize_uncached(self, word):
+        if self.wordnet_missing:
+            return word
+        if self._lemmatizer is None:
+            _import_nltk()
+            if _available.get('wordnet') is False:
+                self._disable_wordnet()
+                return word
+            from nltk.stem import WordNetLemmatizer
+
+            self._lemmatizer = WordNetLemmatizer()
+        try:
+            return self._lemmatizer.lemmatize(word)
+        except LookupError:
+            self._disable_wordnet()
+            return word
+
+    def _disable_wordnet(self):
+        # No local WordNet: keep serving with the words as typed.
+        if not self.wordnet_missing:
+            print("WordNet data not found; lemmatization disabled for unseen words.")
+        self.wordnet_missing = True
+
+    def warm_up(self):
+        self._lemmatize_uncached('careers')
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+lemma_cache = LemmaCache()
+
+_stats_lock = threading.Lock()
+_calls = 0
+_fast_path_calls = 0
+_total_seconds = 0.0
+
+
+def tokenize(sentence):
+    if _FAST_PATH_RE.fullmatch(sentence) and not _SLOW_COMMA_RE.search(sentence):
+        return _fast_tokenize(sentence), True
+    # Without the sentence model, skip sentence splitting rather than fail
+    # the turn.
+    nltk = _import_nltk()
+    preserve_line = _available.get(_sentence_model(nltk)) is False
+    return nltk.word_tokenize(sentence, preserve_line=preserve_line), False
+
+
+def lemmatize(word):
+    return lemma_cache.lemmatize(word)
+
+
+def seed_lemmas(words, lemmas=None):
+    lemma_cache.seed(words, lemmas)
+
+
+def changed_lemmas(words, cache=None):
+    # The words WordNet lemmatizes to something else, bypassing the cache.
+    cache = lemma_cache if cache is None else cache
+    changed = {}
+    for word in words:
+        lemma = cache._lemmatize_uncached(word)
+        if lemma != word:
+            changed[word] = lemma
+    return changed
+
+
+def clean_up_sentence(sentence):
+    global _calls, _fast_path_calls, _total_seconds
+    started = time.perf_counter()
+    sentence_words, fast = tokenize(sentence)
+    sentence_words = [lemma_cache.lemmatize(word.lower()) for word in sentence_words]
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        _calls += 1
+        _fast_path_calls += fast
+        _total_seconds += elapsed
+    return sentence_words
+
+
+def stats():
+    with _stats_lock:
+        calls, fast_path_calls, total_seconds = _calls, _fast_path_calls, _total_seconds
+    return {
+        'nltk_resources': dict(_available),
+        'calls': calls,
+        'fast_path_calls': fast_path_calls,
+        'mean_ms_per_call': total_seconds * 1000.0 / calls if calls else 0.0,
+        'lemma_cache': lemma_cache.stats(),
+    }
@@ -0,0 +1,106 @@
+import random
+import re
+
+stream_career_paths = {
+    "MPC": ["engineering", "architecture", "physics research"],
+    "BIPC": ["medicine", "biotechnology", "nursing"],
+    "COMMERCE": ["accounting", "finance", "business management"],
+}
+
+major_higher_study = {
+    "computer science": ["M.Tech in Computer Science", "MS in Computer Science", "MBA in Technology Management"],
+    "mechanical engineering": ["M.Tech in Mechanical Engineering", "MS in Mechanical Engineering", "MBA"],
+    "biology": ["M.Sc in Biology", "PhD in Biological Sciences", "MBA in Biotechnology Management"],
+    "mba": ["PhD in Management", "Executive MBA", "Specialized Certifications in Finance or Marketing"],
+}
+
+UNKNOWN_RESPONSE = "I’m not sure how to help with that. Could you tell me more or ask something else?"
+MISSING_TAG_RESPONSE = "I’m not sure how to respond to that."
+
+
+def _career_path(user_data):
+    stream = user_data.get('stream', 'your stream')
+    return random.choice(stream_career_paths.get(stream.upper(), ["various fields"]))
+
+
+def _higher_study(user_data):
+    major = user_data.get('major', 'your major')
+    return random.choice(major_higher_study.get(major.lower(), ["a Master's degree"]))
+
+
+# Each placeholder maps to a function of user_data; anything else in braces
+# is left untouched in the rendered text.
+PLACEHOLDERS = {
+    'name': lambda user_data: user_data.get('name', 'friend'),
+    'stage': lambda user_data: user_data.get('stage', ''),
+    'stream': lambda user_data: user_data.get('stream', 'your stream'),
+    'major': lambda user_data: user_data.get('major', 'your major'),
+    'year': lambda user_data: user_data.get('year', 'your year'),
+    'field': lambda user_data: user_data.get('field', 'your field'),
+    'email': lambda user_data: user_data.get('email', ''),
+    'career_path': _career_path,
+    'higher_study': _higher_study,
+}
+
+PLACEHOLDER_RE = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+
+class ResponseTemplate:
+    # A response split once into literal text and placeholder names, so
+    # rendering is a single pass with no searching.
+    __slots__ = ('text', 'parts', 'fields')
+
+    def __init__(self, text):
+        self.text = text
+        parts = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            parts.append((text[position:match.start()], match.group(1)))
+            position = match.end()
+        parts.append((text[position:], None))
+        self.parts = tuple(parts)
+        self.fields = tuple(dict.fromkeys(field for _, field in parts if field))
+
+    def render(self, user_data):
+        if not self.fields:
+            return self.text
+        values = {field: PLACEHOLDERS[field](user_data) for field in self.fields}
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field:
+                out.append(values[field])
+        return ''.join(out)
+
+
+class ResponseIndex:
+    # tag -> compiled response templates, built once when intents are loaded.
+
+    def __init__(self, intents):
+        index = {}
+        for intent in intents:
+            if not isinstance(intent, dict):
+                raise TypeError(f"Expected intent to be a dictionary, but got {type(intent)}: {intent}")
+            responses = intent.get('responses') or []
+            # First occurrence of a tag wins, as the old linear scan did.
+            index.setdefault(intent['tag'], tuple(ResponseTemplate(r) for r in responses))
+        self._index = index
+        self._unknown = ResponseTemplate(UNKNOWN_RESPONSE)
+        self._missing = ResponseTemplate(MISSING_TAG_RESPONSE)
+
+    def __contains__(self, tag):
+        return tag in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def template(self, tag):
+        if tag == 'unknown':
+            return self._unknown
+        templates = self._index.get(tag)
+        if not templates:
+            return self._missing
+        return random.choice(templates)
+
+    def render(self, tag, user_data):
+        return self.template(tag).render(user_data)
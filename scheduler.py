@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('CAREERVIHARI_MAX_BATCH_SIZE', '32'))
+DEFAULT_BATCH_WINDOW_MS = float(os.environ.get('CAREERVIHARI_BATCH_WINDOW_MS', '2'))
+# Seconds predict() waits for its batch before giving up (0 waits forever).
+PREDICT_TIMEOUT = float(os.environ.get('CAREERVIHARI_PREDICT_TIMEOUT', '30'))
+
+_STOP = object()
+
+
+class _Request:
+    __slots__ = ('item', 'future', 'enqueued_at')
+
+    def __init__(self, item):
+        self.item = item
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    # Collects concurrent predict requests from all sessions and runs them as
+    # one batch. predict_batch takes a list of items and must return a list of
+    # results in the same order. With concurrency > 1 several batches can be
+    # in flight at once, e.g. one per worker process.
+
+    def __init__(self, predict_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 batch_window_ms=DEFAULT_BATCH_WINDOW_MS, wait_samples=4096, concurrency=1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.batch_window = max(batch_window_ms, 0.0) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_waits = deque(maxlen=wait_samples)
+        self._requests = 0
+        self._batches = 0
+        self._last_batch_size = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f'intent-batch-scheduler-{i}', daemon=True)
+            for i in range(max(concurrency, 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, item):
+        request = _Request(item)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, item, timeout=PREDICT_TIMEOUT):
+        return self.submit(item).result(timeout or None)
+
+    def close(self):
+        self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        # Only hold the batch open when traffic is already concurrent; a lone
+        # request at low load is dispatched immediately so p99 is not padded
+        # by the window.
+        wait = self.batch_window if self._last_batch_size > 1 else 0.0
+        deadline = first.enqueued_at + wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.put(_STOP)
+                return
+            batch = self._collect(first)
+            started = time.perf_counter()
+            try:
+                results = self.predict_batch([request.item for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"predict_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+            else:
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._batch_sizes[len(batch)] += 1
+                self._queue_waits.extend(started - request.enqueued_at for request in batch)
+            self._last_batch_size = len(batch)
+
+    def stats(self):
+        with self._lock:
+            waits = np.array(self._queue_waits, dtype=np.float64) * 1000.0
+            stats = {
+                'requests': self._requests,
+                'batches': self._batches,
+                'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'batch_window_ms': self.batch_window * 1000.0,
+                'concurrency': len(self._threads),
+            }
+        if waits.size:
+            stats['queue_wait_ms'] = {
+                'p50': float(np.percentile(waits, 50)),
+                'p95': float(np.percentile(waits, 95)),
+                'p99': float(np.percentile(waits, 99)),
+                'max': float(waits.max()),
+            }
+        return stats
@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from engine import ConversationEngine, ConversationSession
+from metrics import metrics
+from session import SESSION_IDLE_SECONDS, SessionArchive, memory_report
+from session_store import open_session_store
+from workers import DEFAULT_WORKERS
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ChatServer:
+    # Serves the conversation engine over HTTP/JSON. Sessions live in this
+    # process; turns run on a thread pool so concurrent sessions share the
+    # engine's batch scheduler, and each session handles one turn at a time.
+    # Sessions idle for longer than idle_seconds move to a compressed archive
+    # and come back transparently on their next request. With a session
+    # store, every turn's resulting state is also saved (write-behind) and a
+    # session unknown to this process is restored from it, so sessions
+    # survive a restart. A session held in memory is never reloaded from the
+    # store, so each session's requests must stay on one process.
+
+    def __init__(self, engine, max_workers=32, idle_seconds=SESSION_IDLE_SECONDS, archive=None, store=None):
+        self.engine = engine
+        self.sessions = {}
+        self._locks = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat-turn')
+        self.idle_seconds = idle_seconds
+        self.archive = archive if archive is not None else SessionArchive()
+        self.store = store
+
+    async def _get_session(self, session_id):
+        if session_id not in self.sessions:
+            session = self.archive.pop(session_id)
+            if session is None and self.store is not None:
+                # A disk read, which can wait behind a flush; kept off the loop.
+                loop = asyncio.get_running_loop()
+                session = await loop.run_in_executor(self._executor, self.store.load, session_id)
+                if session_id in self.sessions:
+                    # Another request restored it while this one waited.
+                    session = self.sessions[session_id]
+            if session is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown session '{session_id}'")
+            self.sessions[session_id] = session
+            self._locks.setdefault(session_id, asyncio.Lock())
+        return self.sessions[session_id], self._locks[session_id]
+
+    def evict_idle(self, now=None):
+        # Archives sessions idle past idle_seconds, skipping any mid-turn.
+        now = time.monotonic() if now is None else now
+        idle = [session_id for session_id, session in self.sessions.items()
+                if now - session.last_active > self.idle_seconds and not self._locks[session_id].locked()]
+        for session_id in idle:
+            self.archive.put(session_id, self.sessions.pop(session_id))
+            self._locks.pop(session_id, None)
+        return len(idle)
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(max(self.idle_seconds / 4, 1.0))
+            self.evict_idle()
+
+    async def _run_turn(self, session_id, action, *args):
+        session, lock = await self._get_session(session_id)
+        session.touch()
+        loop = asyncio.get_running_loop()
+        async with lock:
+            try:
+                replies = await loop.run_in_executor(self._executor, action, session, *args)
+            except ValueError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+            if self.store is not None:
+                if session.ended:
+                    self.store.delete(session_id)
+                else:
+                    self.store.save(session_id, session)
+        payload = {"session_id": session_id, "replies": replies, "session": session.to_dict(messages=False)}
+        if session.ended:
+            self.sessions.pop(session_id, None)
+            self._locks.pop(session_id, None)
+        return payload
+
+    async def dispatch(self, method, path, body):
+        parts = [p for p in path.split('?', 1)[0].split('/') if p]
+
+        if parts == ['health'] and method == 'GET':
+            return HTTPStatus.OK, {"status": "ok", "sessions": len(self.sessions)}
+
+        if parts == ['stats'] and method == 'GET':
+            stats = self.engine.stats()
+            stats['sessions'] = {**memory_report(list(self.sessions.values())), **self.archive.stats()}
+            if self.store is not None:
+                loop = asyncio.get_running_loop()
+                stats['session_store'] = await loop.run_in_executor(self._executor, self.store.stats)
+            return HTTPStatus.OK, stats
+
+        if parts == ['metrics'] and method == 'GET':
+            if not metrics.enabled:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Metrics are disabled; set CAREERVIHARI_METRICS=1")
+            return HTTPStatus.OK, metrics.prometheus()
+
+        if parts == ['explain'] and method == 'POST':
+            text = _require(body, 'text')
+            loop = asyncio.get_running_loop()
+            return HTTPStatus.OK, await loop.run_in_executor(self._executor, self.engine.explain, text)
+
+        if parts == ['sessions'] and method == 'POST':
+            session_id = uuid.uuid4().hex
+            session = ConversationSession()
+            self.sessions[session_id] = session
+            self._locks[session_id] = asyncio.Lock()
+            replies = self.engine.start(session)
+            if self.store is not None:
+                self.store.save(session_id, session)
+            return HTTPStatus.CREATED, {"session_id": session_id, "replies": replies, "session": session.to_dict(messages=False)}
+
+        if len(parts) == 2 and parts[0] == 'sessions':
+            session, _ = await self._get_session(parts[1])
+            if method == 'GET':
+                return HTTPStatus.OK, {"session_id": parts[1], "session": session.to_dict()}
+            if method == 'DELETE':
+                self.sessions.pop(parts[1], None)
+                self._locks.pop(parts[1], None)
+                self.archive.discard(parts[1])
+                if self.store is not None:
+                    self.store.delete(parts[1])
+                return HTTPStatus.OK, {"session_id": parts[1], "deleted": True}
+
+        if len(parts) == 3 and parts[0] == 'sessions' and method == 'POST':
+            session_id, action = parts[1], parts[2]
+            if action == 'messages':
+                text = _require(body, 'text')
+                return HTTPStatus.OK, await self._run_turn(session_id, self.engine.handle_message, text)
+            if action == 'stage':
+                stage = _require(body, 'stage')
+                return HTTPStatus.OK, await self._run_turn(session_id, self.engine.select_stage, stage)
+            if action == 'undergrad':
+                major = _require(body, 'major')
+                year = _require(body, 'year')
+                return HTTPStatus.OK, await self._run_turn(session_id, self.engine.submit_undergrad, major, year)
+            if action == 'postgrad':
+                field = _require(body, 'field')
+                return HTTPStatus.OK, await self._run_turn(session_id, self.engine.submit_postgrad, field)
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await _write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                length = int(headers.get('content-length', '0') or 0)
+                if length > MAX_BODY_BYTES:
+                    await _write_response(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}, False)
+                    break
+                raw_body = await reader.readexactly(length) if length else b''
+
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                    if not isinstance(body, dict):
+                        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+                    status, payload = await self.dispatch(method.upper(), path, body)
+                except json.JSONDecodeError as e:
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e}"}
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+                await _write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"CareerVihari AI API listening on http://{host}:{port}")
+        reaper = asyncio.create_task(self._reap_idle()) if self.idle_seconds > 0 else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if reaper is not None:
+                reaper.cancel()
+
+
+def _require(body, key):
+    value = body.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{key}' must be a non-empty string")
+    return value
+
+
+async def _write_response(writer, status, payload, keep_alive):
+    # Strings go out as plain text (the Prometheus format), anything else as JSON.
+    if isinstance(payload, str):
+        body = payload.encode('utf-8')
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        content_type = 'application/json; charset=utf-8'
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CareerVihari AI conversation engine as an HTTP/JSON API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--backend', default=None, help="Model backend: numpy (default) or keras")
+    parser.add_argument('--threads', type=int, default=32, help="Threads used to run turns concurrently")
+    parser.add_argument('--processes', type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes for classification (0 classifies in-process)")
+    args = parser.parse_args()
+
+    engine = ConversationEngine.from_files(args.backend, workers=args.processes)
+    asyncio.run(ChatServer(engine, max_workers=args.threads, store=open_session_store()).serve(args.host, args.port))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from enum import IntEnum
+
+HISTORY_LIMIT = int(os.environ.get('CAREERVIHARI_HISTORY_LIMIT', '200'))
+SESSION_IDLE_SECONDS = float(os.environ.get('CAREERVIHARI_SESSION_IDLE_SECONDS', '900'))
+ARCHIVE_LIMIT = int(os.environ.get('CAREERVIHARI_SESSION_ARCHIVE_LIMIT', '100000'))
+
+
+class Sender(IntEnum):
+    USER = 0
+    BOT = 1
+
+
+SENDER_NAMES = ('User', 'Bot')
+CSS_CLASSES = ('user-message', 'bot-message')
+
+
+class Message:
+    # One transcript entry: the raw text and who sent it. The sender's name
+    # and CSS class are derived from the enum rather than stored per message.
+    __slots__ = ('sender', 'text')
+
+    def __init__(self, sender, text):
+        self.sender = sender
+        self.text = text
+
+    @property
+    def css_class(self):
+        return CSS_CLASSES[self.sender]
+
+    def to_dict(self):
+        return {"sender": SENDER_NAMES[self.sender], "message": self.text, "type": CSS_CLASSES[self.sender]}
+
+
+class ConversationSession:
+    # Everything one user's conversation needs, with no UI dependencies.
+    # chat_history holds raw text; escaping for HTML is the frontend's job.
+    # It is a ring buffer of the last history_limit messages (0 keeps all);
+    # message_count counts every message ever added, so a frontend can tell
+    # how many are new even after old ones have dropped off.
+    __slots__ = ('history_limit', 'chat_history', 'message_count', 'chat_started', 'conversation_state', 'user_data',
+                 'stage_prompt_displayed', 'show_undergrad_form', 'show_postgrad_form', 'ended', 'last_active')
+
+    def __init__(self, history_limit=HISTORY_LIMIT):
+        self.history_limit = history_limit
+        self.reset()
+
+    def reset(self):
+        self.chat_history = deque(maxlen=self.history_limit or None)
+        self.message_count = 0
+        self.chat_started = False
+        self.conversation_state = 'initial'
+        self.user_data = {}
+        self.stage_prompt_displayed = False
+        self.show_undergrad_form = False
+        self.show_postgrad_form = False
+        self.ended = False
+        self.last_active = time.monotonic()
+
+    def add_message(self, sender, message):
+        self.chat_history.append(Message(sender, message))
+        self.message_count += 1
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def to_dict(self, messages=True):
+        state = {
+            "chat_started": self.chat_started,
+            "conversation_state": self.conversation_state,
+            "user_data": dict(self.user_data),
+            "show_undergrad_form": self.show_undergrad_form,
+            "show_postgrad_form": self.show_postgrad_form,
+            "awaiting_stage": self.conversation_state == 'stage_selection',
+            "ended": self.ended,
+        }
+        if messages:
+            state["messages"] = [message.to_dict() for message in self.chat_history]
+        return state
+
+    def snapshot(self):
+        # Plain JSON-able state, for archiving and restoring the session.
+        return {
+            "history_limit": self.history_limit,
+            "messages": [[int(m.sender), m.text] for m in self.chat_history],
+            "message_count": self.message_count,
+            "chat_started": self.chat_started,
+            "conversation_state": self.conversation_state,
+            "user_data": dict(self.user_data),
+            "stage_prompt_displayed": self.stage_prompt_displayed,
+            "show_undergrad_form": self.show_undergrad_form,
+            "show_postgrad_form": self.show_postgrad_form,
+            "ended": self.ended,
+        }
+
+    @classmethod
+    def restore(cls, state):
+        session = cls(state["history_limit"])
+        session.chat_history.extend(Message(Sender(sender), text) for sender, text in state["messages"])
+        for key in ('message_count', 'chat_started', 'conversation_state', 'user_data', 'stage_prompt_displayed',
+                    'show_undergrad_form', 'show_postgrad_form', 'ended'):
+            setattr(session, key, state[key])
+        session.user_data = dict(session.user_data)
+        return session
+
+    def memory_bytes(self):
+        # Approximate deep size of the session's own objects.
+        size = sys.getsizeof(self) + sys.getsizeof(self.chat_history) + sys.getsizeof(self.user_data)
+        size += sys.getsizeof(self.conversation_state)
+        for message in self.chat_history:
+            size += sys.getsizeof(message) + sys.getsizeof(message.text)
+        for key, value in self.user_data.items():
+            size += sys.getsizeof(key) + sys.getsizeof(value)
+        return size
+
+
+def encode_snapshot(state):
+    # Compressed JSON, as kept by the archive and the session store.
+    return zlib.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_snapshot(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def memory_report(sessions):
+    sizes = [session.memory_bytes() for session in sessions]
+    messages = [len(session.chat_history) for session in sessions]
+    return {
+        'sessions': len(sizes),
+        'total_bytes': sum(sizes),
+        'mean_bytes': sum(sizes) / len(sizes) if sizes else 0.0,
+        'max_bytes': max(sizes, default=0),
+        'mean_messages': sum(messages) / len(messages) if messages else 0.0,
+    }
+
+
+class SessionArchive:
+    # Idle sessions, kept as zlib-compressed JSON snapshots until they are
+    # used again. Bounded; the least recently archived are dropped first.
+
+    def __init__(self, maxsize=ARCHIVE_LIMIT):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.archived = 0
+        self.restored = 0
+        self.dropped = 0
+
+    def put(self, session_id, session):
+        blob = encode_snapshot(session.snapshot())
+        with self._lock:
+            self._data[session_id] = blob
+            self._data.move_to_end(session_id)
+            self.archived += 1
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.dropped += 1
+
+    def pop(self, session_id):
+        with self._lock:
+            blob = self._data.pop(session_id, None)
+            if blob is None:
+                return None
+            self.restored += 1
+        return ConversationSession.restore(decode_snapshot(blob))
+
+    def discard(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def __contains__(self, session_id):
+        return session_id in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'archived_sessions': len(self._data),
+                'archived_bytes': sum(len(blob) for blob in self._data.values()),
+                'archived_total': self.archived,
+                'restored_total': self.restored,
+                'dropped_total': self.dropped,
+            }
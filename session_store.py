@@ -0,0 +1,216 @@
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+from metrics import metrics
+from session import ConversationSession, decode_snapshot, encode_snapshot
+
+# Off unless set to 'sqlite', which keeps sessions across restarts.
+SESSION_STORE = os.environ.get('CAREERVIHARI_SESSION_STORE', 'none')
+# Cookie identifying a Streamlit client whose conversation is stored.
+SESSION_COOKIE = os.environ.get('CAREERVIHARI_SESSION_COOKIE')
+SESSION_DB = os.environ.get('CAREERVIHARI_SESSION_DB', 'sessions.db')
+FLUSH_SECONDS = float(os.environ.get('CAREERVIHARI_SESSION_FLUSH_SECONDS', '0.5'))
+# Stored sessions not updated for this many days are deleted on startup (0 keeps them).
+SESSION_TTL_DAYS = float(os.environ.get('CAREERVIHARI_SESSION_TTL_DAYS', '30'))
+# Flush early once this many sessions are waiting.
+MAX_PENDING = 1000
+
+
+class SqliteSessionStore:
+    # One row per session key holding its compressed snapshot. WAL mode lets
+    # several server processes share the file; synchronous=NORMAL skips the
+    # fsync on every commit, which only matters on power loss.
+
+    def __init__(self, path=SESSION_DB, ttl_days=SESSION_TTL_DAYS):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                               '(key TEXT PRIMARY KEY, state BLOB NOT NULL, updated REAL NOT NULL)')
+            if ttl_days > 0:
+                self._conn.execute('DELETE FROM sessions WHERE updated < ?', (time.time() - ttl_days * 86400.0,))
+
+    def load(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT state FROM sessions WHERE key = ?', (key,)).fetchone()
+        return decode_snapshot(row[0]) if row is not None else None
+
+    def write(self, upserts, deletes):
+        # upserts: (key, blob) pairs; deletes: keys. One transaction per batch.
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO sessions (key, state, updated) VALUES (?, ?, ?)',
+                                       [(key, blob, now) for key, blob in upserts])
+                self._conn.executemany('DELETE FROM sessions WHERE key = ?', [(key,) for key in deletes])
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+STORES = {'sqlite': SqliteSessionStore}
+
+
+class WriteBehindStore:
+    # Sessions saved during a turn are only snapshotted in memory; a
+    # background thread writes them to the backend every flush_seconds, in
+    # one transaction, so a turn never waits on the disk. Saves of the same
+    # key between flushes are coalesced into the latest snapshot. Loads see
+    # snapshots that are still waiting to be written.
+
+    def __init__(self, backend, flush_seconds=FLUSH_SECONDS, max_pending=MAX_PENDING):
+        self.backend = backend
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending = {}
+        self._writing = {}
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self.saved = 0
+        self.coalesced = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name='session-store', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, key, session):
+        state = session.snapshot()
+        with self._cond:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = state
+            self.saved += 1
+            if len(self._pending) >= self.max_pending:
+                self._cond.notify()
+
+    def delete(self, key):
+        with self._cond:
+            self._pending[key] = None
+
+    def load(self, key):
+        # A restored session, or None if the key is unknown or was deleted.
+        with self._cond:
+            if key in self._pending:
+                state = self._pending[key]
+            elif key in self._writing:
+                state = self._writing[key]
+            else:
+                state = False
+        if state is False:
+            state = self.backend.load(key)
+        if state is None:
+            return None
+        metrics.inc('session_store', 'result', 'restored')
+        return ConversationSession.restore(state)
+
+    def flush(self):
+        # Writes everything saved so far before returning.
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+            self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        started = time.perf_counter()
+        upserts = []
+        deletes = []
+        for key, state in batch.items():
+            if state is None:
+                deletes.append(key)
+                continue
+            try:
+                upserts.append((key, encode_snapshot(state)))
+            except (TypeError, ValueError) as e:
+                # A snapshot that cannot be encoded is dropped, not retried.
+                print(f"Warning: could not encode session {key}: {e}", file=sys.stderr)
+                with self._cond:
+                    self.errors += 1
+        try:
+            self.backend.write(upserts, deletes)
+        except (sqlite3.Error, OSError) as e:
+            # Keep the batch for the next flush unless newer saves replaced it.
+            print(f"Warning: could not write {len(batch)} sessions: {e}", file=sys.stderr)
+            with self._cond:
+                self.errors += 1
+                for key, state in batch.items():
+                    self._pending.setdefault(key, state)
+                self._writing = {}
+            return
+        with self._cond:
+            self.written += len(upserts) + len(deletes)
+            self.flushes += 1
+            self._writing = {}
+        metrics.observe('session_store_flush', time.perf_counter() - started)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self.flush_seconds)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception:
+                # Anything unexpected drops the batch in hand; the thread keeps
+                # writing later saves.
+                print("Warning: session store flush failed:", file=sys.stderr)
+                traceback.print_exc()
+                with self._cond:
+                    self.errors += 1
+                    self._writing = {}
+            if closed:
+                return
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.backend.close()
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                'pending': len(self._pending),
+                'saved_total': self.saved,
+                'coalesced_total': self.coalesced,
+                'written_total': self.written,
+                'flushes_total': self.flushes,
+                'errors_total': self.errors,
+            }
+        stats['stored_sessions'] = len(self.backend)
+        return stats
+
+
+def open_session_store(kind=SESSION_STORE):
+    if kind in ('', 'none'):
+        return None
+    if kind not in STORES:
+        raise ValueError(f"Unknown session store '{kind}', expected none or one of {', '.join(STORES)}")
+    return WriteBehindStore(STORES[kind]())
@@ -0,0 +1,40 @@
+import time
+from contextlib import contextmanager
+
+PROCESS_STARTED = time.perf_counter()
+
+
+class StartupReport:
+    # Wall-clock breakdown of process startup, one entry per named phase.
+
+    def __init__(self):
+        self.phases = []
+        self.ready_at = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def mark_ready(self):
+        self.ready_at = time.perf_counter()
+
+    def as_dict(self):
+        report = {'phases_ms': {name: round(seconds * 1000.0, 2) for name, seconds in self.phases}}
+        if self.ready_at is not None:
+            report['total_ms'] = round((self.ready_at - PROCESS_STARTED) * 1000.0, 2)
+        return report
+
+    def format(self):
+        lines = ["Startup timing:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<16} {seconds * 1000.0:9.1f} ms")
+        if self.ready_at is not None:
+            lines.append(f"  {'total':<16} {(self.ready_at - PROCESS_STARTED) * 1000.0:9.1f} ms (since first import)")
+        return "\n".join(lines)
+
+
+startup_report = StartupReport()
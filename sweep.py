@@ -0,0 +1,255 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from inference import NumpyIntentModel
+from workers import available_cpus
+
+_state = None
+
+
+def _init(features, labels, n_classes, optimizer, batch_size, sparse, seed, threads):
+    # Runs once per worker: the feature matrices arrive here, not with every
+    # task, and TensorFlow is configured for this worker's share of the CPUs.
+    global _state
+    from new_train import configure_tensorflow
+
+    tf = configure_tensorflow(seed, threads)
+    y = np.eye(n_classes, dtype=np.float32)[labels]
+    _state = (tf, features, labels, y, optimizer, batch_size, sparse, seed)
+
+
+def dense_layers(model):
+    # The Keras model's Dense weights in NumpyIntentModel's layer format.
+    from tensorflow.keras.layers import Dense
+
+    return [(kernel, bias, layer.get_config()['activation'])
+            for layer in model.layers if isinstance(layer, Dense)
+            for kernel, bias in [layer.get_weights()]]
+
+
+def _run_fold(task):
+    # Trains one (hidden, max_features) model on one fold for the largest
+    # epoch count, scoring the held-out fold after each epoch count in the
+    # grid, so every epoch setting costs one training run.
+    from new_train import build_model, make_batches
+
+    tf, features, labels, y, optimizer, batch_size, sparse, seed = _state
+    hidden, max_features, fold, train_rows, test_rows, epochs, keep = task
+    X = features[max_features]
+    scores = {}
+
+    class Checkpoints(tf.keras.callbacks.Callback):
+        def on_epoch_end(self, epoch, logs=None):
+            if epoch + 1 in epochs:
+                model = NumpyIntentModel(dense_layers(self.model))
+                predicted = np.argmax(model.predict(X[test_rows]), axis=1)
+                scores[epoch + 1] = float(np.mean(predicted == labels[test_rows]))
+
+    tf.random.set_seed(seed)
+    rng = np.random.default_rng(seed + fold)
+    model = build_model(tf, X.shape[1], y.shape[1], optimizer, sparse, hidden)
+    started = time.perf_counter()
+    model.fit(make_batches(tf, X[train_rows], y[train_rows], batch_size, rng, sparse),
+              epochs=max(epochs), callbacks=[Checkpoints()], shuffle=False, verbose=0)
+    return {
+        'hidden': hidden,
+        'max_features': max_features,
+        'fold': fold,
+        'accuracy': scores,
+        'train_s': time.perf_counter() - started,
+        'layers': dense_layers(model) if keep else None,
+    }
+
+
+def stratified_folds(labels, k, rng):
+    # Each intent's patterns are dealt round-robin into k folds after a
+    # shuffle, so every fold holds about 1/k of every intent.
+    fold_of = np.empty(len(labels), dtype=np.int64)
+    for label in np.unique(labels):
+        rows = rng.permutation(np.flatnonzero(labels == label))
+        fold_of[rows] = (np.arange(len(rows)) + rng.integers(k)) % k
+    return [(np.flatnonzero(fold_of != fold), np.flatnonzero(fold_of == fold)) for fold in range(k)]
+
+
+def build_features(patterns, sizes):
+    # One TF-IDF matrix per vocabulary size, shared by every fold and width.
+    features = {}
+    vocabulary = {}
+    for size in sorted(set(sizes)):
+        vectorizer = TfidfVectorizer(max_features=size, stop_words='english')
+        features[size] = vectorizer.fit_transform(patterns).astype(np.float32).tocsr()
+        vocabulary[size] = len(vectorizer.vocabulary_)
+    return features, vocabulary
+
+
+def single_message_latency(layers, X, repeat):
+    # Per-message forward pass with the serving backend, one row at a time
+    # as a turn classifies it.
+    model = NumpyIntentModel(layers)
+    rows = [X[i] for i in range(X.shape[0])]
+    for row in rows:
+        model.predict(row)
+    samples = np.empty(len(rows) * repeat, dtype=np.float64)
+    clock = time.perf_counter
+    k = 0
+    for _ in range(repeat):
+        for row in rows:
+            t0 = clock()
+            model.predict(row)
+            samples[k] = clock() - t0
+            k += 1
+    p50, p95 = np.percentile(samples, [50, 95]) * 1e6
+    return round(float(p50), 2), round(float(p95), 2)
+
+
+def model_size(layers):
+    parameters = sum(kernel.size + bias.size for kernel, bias, _ in layers)
+    return int(parameters), round(parameters * 4 / 1024.0, 1)
+
+
+def choose(results, target):
+    # The smallest model whose mean accuracy meets the target; latency, then
+    # fewer epochs, break ties.
+    passing = [r for r in results if r['accuracy_mean'] >= target]
+    if not passing:
+        return None
+    return min(passing, key=lambda r: (r['size_kb'], r['latency_p50_us'], r['epochs'], -r['accuracy_mean']))
+
+
+def run(args):
+    import new_train
+    from new_train import PRESETS, build_corpus, load_intents, load_train_cache, one_hot_labels
+
+    missing = new_train.ensure_nltk_resources()
+    if missing:
+        raise SystemExit(f"Missing NLTK data: {', '.join(missing)}. Install it or rerun with CAREERVIHARI_NLTK_DOWNLOAD=1.")
+
+    preset = PRESETS['fast' if args.fast else 'legacy']
+    optimizer = args.optimizer or preset['optimizer']
+    batch_size = args.batch_size or preset['batch_size']
+    epochs = sorted(set(args.epochs))
+    hidden_grid = [tuple(int(units) for units in spec.split(',')) for spec in args.hidden]
+
+    started = time.perf_counter()
+    intents = load_intents()
+    _, classes, documents, patterns, _ = build_corpus(intents, load_train_cache())
+    labels, _ = one_hot_labels(documents, classes)
+    features, vocabulary = build_features(patterns, args.max_features)
+    folds = stratified_folds(labels, args.folds, np.random.default_rng(args.seed))
+    print(f"{len(patterns)} patterns, {len(classes)} intents, {args.folds} folds; "
+          f"features ready in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+    tasks = [(hidden, size, fold, train_rows, test_rows, epochs, fold == 0)
+             for hidden, size in itertools.product(hidden_grid, sorted(set(args.max_features)))
+             for fold, (train_rows, test_rows) in enumerate(folds)]
+    initargs = (features, labels, len(classes), optimizer, batch_size, not args.dense_batches, args.seed,
+                args.threads or max(1, available_cpus() // max(args.processes, 1)))
+    if args.processes > 0:
+        pool = multiprocessing.get_context('spawn').Pool(args.processes, initializer=_init, initargs=initargs)
+        runs = pool.imap_unordered(_run_fold, tasks)
+    else:
+        pool = None
+        _init(*initargs)
+        runs = map(_run_fold, tasks)
+
+    folds_done = {}
+    try:
+        for n, result in enumerate(runs, 1):
+            folds_done.setdefault((result['hidden'], result['max_features']), []).append(result)
+            print(f"[{n}/{len(tasks)}] hidden {result['hidden']} max_features {result['max_features']} "
+                  f"fold {result['fold']}: {result['train_s']:.1f} s, accuracy "
+                  + ' '.join(f"{e}:{result['accuracy'][e]:.4f}" for e in epochs), file=sys.stderr)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    # Latency is measured here, after the pool has stopped, so training in
+    # other processes does not skew it.
+    results = []
+    for (hidden, size), runs_done in sorted(folds_done.items()):
+        layers = next(r['layers'] for r in runs_done if r['layers'] is not None)
+        p50, p95 = single_message_latency(layers, features[size][folds[0][1]], args.repeat)
+        parameters, size_kb = model_size(layers)
+        for e in epochs:
+            scores = [r['accuracy'][e] for r in runs_done]
+            results.append({
+                'hidden': list(hidden),
+                'max_features': size,
+                'vocabulary': vocabulary[size],
+                'epochs': e,
+                'accuracy_mean': round(float(np.mean(scores)), 4),
+                'accuracy_std': round(float(np.std(scores)), 4),
+                'parameters': parameters,
+                'size_kb': size_kb,
+                'latency_p50_us': p50,
+                'latency_p95_us': p95,
+                'train_s_per_fold': round(float(np.mean([r['train_s'] for r in runs_done])) * e / max(epochs), 2),
+            })
+
+    print(f"\n{'hidden':<12} {'features':>8} {'epochs':>6} {'accuracy':>15} {'params':>9} {'KiB':>8} {'p50 us':>8} {'p95 us':>8}")
+    for r in sorted(results, key=lambda r: -r['accuracy_mean']):
+        print(f"{','.join(map(str, r['hidden'])):<12} {r['vocabulary']:>8} {r['epochs']:>6} "
+              f"{r['accuracy_mean']:>8.4f} ±{r['accuracy_std']:.4f} {r['parameters']:>9} {r['size_kb']:>8.1f} "
+              f"{r['latency_p50_us']:>8.1f} {r['latency_p95_us']:>8.1f}")
+
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'patterns': len(patterns),
+            'intents': len(classes),
+            'folds': args.folds,
+            'optimizer': optimizer,
+            'batch_size': batch_size,
+            'seed': args.seed,
+            'elapsed_s': round(time.perf_counter() - started, 1),
+        },
+        'results': results,
+    }
+    if args.target is not None:
+        best = choose(results, args.target)
+        report['chosen'] = best
+        if best is None:
+            print(f"\nNo setting reaches a mean accuracy of {args.target}.")
+        else:
+            print(f"\nSmallest model with mean accuracy >= {args.target}: {best['accuracy_mean']:.4f}, "
+                  f"{best['size_kb']} KiB, p50 {best['latency_p50_us']} us. Train it with:\n"
+                  f"   python new_train.py --full{' --fast --validation-split 0' if args.fast else ''} --hidden {' '.join(map(str, best['hidden']))} "
+                  f"--max-features {best['max_features']} --epochs {best['epochs']}"
+                  + (f" --batch-size {batch_size}" if args.batch_size else ''))
+    return report
+
+
+if __name__ == '__main__':
+    cpus = available_cpus()
+    parser = argparse.ArgumentParser(description="Cross-validate intent model sizes and training lengths.")
+    parser.add_argument('--hidden', nargs='+', default=['128,64', '64,32', '32'],
+                        help="hidden layer widths to try, comma-separated per setting")
+    parser.add_argument('--max-features', type=int, nargs='+', default=[5000, 500, 250],
+                        help="TF-IDF vocabulary sizes to try")
+    parser.add_argument('--epochs', type=int, nargs='+', default=[50, 100, 200], help="epoch counts to score")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--fast', action='store_true', help="use new_train.py's --fast optimizer and batch size")
+    parser.add_argument('--optimizer', choices=('sgd', 'adam'))
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--dense-batches', action='store_true')
+    parser.add_argument('--target', type=float, help="pick the smallest model with at least this mean accuracy")
+    parser.add_argument('--processes', type=int, default=cpus if cpus > 1 else 0,
+                        help="training processes (0 trains in this process)")
+    parser.add_argument('--threads', type=int, help="TensorFlow threads per process (default: CPUs / processes)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed passes for the latency measurement")
+    parser.add_argument('--seed', type=int, default=int(os.environ.get('CAREERVIHARI_SEED', '42')))
+    parser.add_argument('--output', default='sweep.json', help="where to write the JSON results")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from classifier import normalize
+from engine import ConversationEngine
+from pattern_index import ARRAYS, PatternIndex
+from prediction_cache import PredictionCache
+
+INTENTS = [
+    {'tag': 'data_science', 'patterns': ['what is data science', 'data science career path'],
+     'responses': ['Data science is about learning from data.']},
+    {'tag': 'greeting', 'patterns': ['hello there', 'good morning'], 'responses': ['Hello!']},
+    {'tag': 'mba', 'patterns': ['should I do an mba', 'mba colleges in india'], 'responses': ['An MBA can help.']},
+    {'tag': 'unknown', 'patterns': [], 'responses': ["Sorry, I didn't get that."]},
+]
+
+
+class UnsureModel:
+    # No intent clears the 0.25 threshold, so every message is 'unknown'.
+    def __init__(self, n_classes):
+        self.n_classes = n_classes
+
+    def predict(self, x, verbose=0):
+        return np.full((x.shape[0], self.n_classes), 0.1, dtype=np.float32)
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    texts = [p for intent in INTENTS for p in intent['patterns']]
+    tags = [intent['tag'] for intent in INTENTS for _ in intent['patterns']]
+    normalized = [normalize(text) for text in texts]
+    classes = sorted({intent['tag'] for intent in INTENTS if intent['patterns']})
+    vectorizer = TfidfVectorizer()
+    vectorizer.fit(normalized)
+    index = PatternIndex.build(vectorizer, normalized, texts, tags, classes)
+    return vectorizer, index, normalized, texts, tags, classes
+
+
+def test_exact_pattern_is_its_own_nearest(corpus):
+    vectorizer, index, normalized, texts, tags, _ = corpus
+    for text, norm, tag in zip(texts, normalized, tags):
+        best = index.nearest(vectorizer.transform([norm]), 1)[0]
+        assert best['pattern'] == text and best['intent'] == tag
+        assert best['similarity'] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_scores_match_dense_cosine(corpus):
+    vectorizer, index, normalized, texts, _, _ = corpus
+    query = vectorizer.transform([normalize('data science or an mba career')])
+    dense = vectorizer.transform(normalized).toarray()
+    dense /= np.linalg.norm(dense, axis=1, keepdims=True)
+    q = query.toarray()[0]
+    expected = dense @ (q / np.linalg.norm(q))
+    results = index.nearest(query, k=len(texts))
+    assert [r['pattern'] for r in results][:2] == [texts[i] for i in np.argsort(-expected)[:2]]
+    for r in results:
+        assert r['similarity'] == pytest.approx(expected[texts.index(r['pattern'])], abs=1e-5)
+
+
+def test_no_shared_terms_returns_nothing(corpus):
+    vectorizer, index, _, _, _, _ = corpus
+    assert index.nearest(vectorizer.transform(['zzzz']), 3) == []
+
+
+def test_explain_lists_shared_terms(corpus):
+    vectorizer, index, _, _, _, _ = corpus
+    best = index.nearest(vectorizer.transform([normalize('data science')]), 1, explain=True)[0]
+    terms = [t['term'] for t in best['terms']]
+    assert set(terms) == {'data', 'science'}
+    assert sum(t['contribution'] for t in best['terms']) == pytest.approx(best['similarity'], abs=1e-5)
+
+
+def test_arrays_rebuild_the_same_index(corpus):
+    vectorizer, index, _, texts, _, classes = corpus
+    arrays = index.arrays()
+    assert set(arrays) == set(ARRAYS)
+    copy = PatternIndex(*(arrays[name] for name in ARRAYS), texts, classes, vectorizer.vocabulary_)
+    query = vectorizer.transform([normalize('mba colleges')])
+    assert copy.nearest(query, 2) == index.nearest(query, 2)
+
+
+def make_engine(corpus, threshold):
+    vectorizer, index, _, _, _, classes = corpus
+    return ConversationEngine(INTENTS, [], classes, vectorizer, UnsureModel(len(classes)), cache=PredictionCache(maxsize=0),
+                              pattern_index=index, fallback_similarity=threshold)
+
+
+def test_unknown_falls_back_to_nearest_pattern(corpus):
+    best = make_engine(corpus, 0.5).predict_class('what is data science')[0]
+    assert best['intent'] == 'data_science' and best['source'] == 'nearest_pattern'
+
+
+def test_fallback_respects_similarity_threshold(corpus):
+    engine = make_engine(corpus, 0.99)
+    assert engine.predict_class('science')[0]['intent'] == 'unknown'
+    assert make_engine(corpus, 0.5).predict_class('zzzz')[0]['intent'] == 'unknown'
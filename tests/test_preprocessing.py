@@ -0,0 +1,30 @@
+from preprocessing import LemmaCache
+
+WORDNET = {'data': 'datum', 'as': 'a'}
+
+
+class FakeWordNetCache(LemmaCache):
+    def __init__(self):
+        super().__init__()
+        self.lookups = []
+
+    def _lemmatize_uncached(self, word):
+        self.lookups.append(word)
+        return WORDNET.get(word, word)
+
+
+def test_seed_serves_recorded_lemmas_without_wordnet():
+    cache = FakeWordNetCache()
+    cache.seed(['career', 'data'], {'data': 'datum'})
+    assert cache.lemmatize('data') == 'datum'
+    assert cache.lemmatize('career') == 'career'
+    assert cache.lookups == []
+    assert cache.stats()['hits'] == 2
+
+
+def test_seed_without_a_record_lemmatizes_each_word():
+    cache = FakeWordNetCache()
+    cache.seed(['as', 'career', 'data'])
+    assert cache.lookups == ['as', 'career', 'data']
+    assert [cache.lemmatize(w) for w in ('as', 'career', 'data')] == ['a', 'career', 'datum']
+    assert cache.stats()['misses'] == 0
@@ -0,0 +1,57 @@
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from scheduler import BatchScheduler
+
+
+def test_results_return_in_order():
+    scheduler = BatchScheduler(lambda items: [item * 2 for item in items])
+    try:
+        futures = [scheduler.submit(n) for n in range(50)]
+        assert [f.result(5) for f in futures] == [n * 2 for n in range(50)]
+        assert scheduler.stats()['requests'] == 50
+    finally:
+        scheduler.close()
+
+
+def test_failing_batch_fails_every_request():
+    def predict_batch(items):
+        raise ValueError("model failed")
+
+    scheduler = BatchScheduler(predict_batch)
+    try:
+        with pytest.raises(ValueError, match="model failed"):
+            scheduler.predict('a', timeout=5)
+    finally:
+        scheduler.close()
+
+
+def test_wrong_result_count_fails_every_request():
+    release = threading.Event()
+
+    def predict_batch(items):
+        release.wait(5)
+        return items[:-1]
+
+    scheduler = BatchScheduler(predict_batch, batch_window_ms=50)
+    try:
+        futures = [scheduler.submit(n) for n in range(4)]
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="results for"):
+                future.result(5)
+    finally:
+        scheduler.close()
+
+
+def test_predict_times_out():
+    release = threading.Event()
+    scheduler = BatchScheduler(lambda items: release.wait(5) and items)
+    try:
+        with pytest.raises(TimeoutError):
+            scheduler.predict('a', timeout=0.05)
+    finally:
+        release.set()
+        scheduler.close()
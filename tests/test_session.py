@@ -0,0 +1,85 @@
+import asyncio
+
+from server import ChatServer
+from session import ConversationSession, Sender, SessionArchive, memory_report
+
+
+def make_session(messages=5, history_limit=200):
+    session = ConversationSession(history_limit)
+    session.chat_started = True
+    session.conversation_state = 'undergraduate'
+    session.user_data = {'name': 'Ravi', 'email': 'ravi@example.com', 'stage': 'Undergraduate'}
+    session.show_undergrad_form = True
+    for i in range(messages):
+        session.add_message(Sender.USER if i % 2 == 0 else Sender.BOT, f"message {i}")
+    return session
+
+
+def test_history_is_a_bounded_ring_buffer():
+    session = make_session(messages=25, history_limit=10)
+    assert len(session.chat_history) == 10
+    assert session.message_count == 25
+    assert [m.text for m in session.chat_history] == [f"message {i}" for i in range(15, 25)]
+
+
+def test_zero_history_limit_keeps_everything():
+    session = make_session(messages=300, history_limit=0)
+    assert len(session.chat_history) == 300
+
+
+def test_snapshot_round_trip():
+    session = make_session(messages=7, history_limit=5)
+    restored = ConversationSession.restore(session.snapshot())
+    assert restored.snapshot() == session.snapshot()
+    assert restored.to_dict() == session.to_dict()
+    assert restored.chat_history.maxlen == 5
+
+
+def test_snapshot_does_not_share_user_data():
+    session = make_session()
+    state = session.snapshot()
+    session.user_data['major'] = 'physics'
+    assert 'major' not in state['user_data']
+    restored = ConversationSession.restore(state)
+    restored.user_data['year'] = '2nd Year'
+    assert 'year' not in state['user_data']
+
+
+def test_reset_clears_the_conversation():
+    session = make_session()
+    session.reset()
+    assert not session.chat_history and session.message_count == 0
+    assert session.conversation_state == 'initial' and session.user_data == {}
+
+
+def test_archive_restores_and_drops_oldest():
+    archive = SessionArchive(maxsize=2)
+    sessions = {key: make_session(messages=n) for n, key in enumerate(('a', 'b', 'c'), 1)}
+    for key, session in sessions.items():
+        archive.put(key, session)
+    assert 'a' not in archive and len(archive) == 2
+    restored = archive.pop('c')
+    assert restored.snapshot() == sessions['c'].snapshot()
+    assert archive.pop('c') is None
+    stats = archive.stats()
+    assert (stats['archived_total'], stats['restored_total'], stats['dropped_total']) == (3, 1, 1)
+
+
+def test_memory_report():
+    report = memory_report([make_session(messages=2), make_session(messages=4)])
+    assert report['sessions'] == 2 and report['mean_messages'] == 3.0
+    assert report['max_bytes'] >= report['mean_bytes'] > 0
+    assert memory_report([])['total_bytes'] == 0
+
+
+def test_server_archives_idle_sessions_and_restores_them():
+    server = ChatServer(engine=None, idle_seconds=60)
+    session = make_session()
+    server.sessions['a'] = session
+    server._locks['a'] = asyncio.Lock()
+    assert server.evict_idle(now=session.last_active + 30) == 0
+    assert server.evict_idle(now=session.last_active + 61) == 1
+    assert 'a' not in server.sessions and 'a' in server.archive
+    restored, _ = asyncio.run(server._get_session('a'))
+    assert restored.snapshot() == session.snapshot()
+    assert 'a' in server.sessions and 'a' not in server.archive
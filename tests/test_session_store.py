@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from server import ChatServer
+from session import ConversationSession, Sender
+from session_store import SqliteSessionStore, WriteBehindStore
+
+
+def make_session(name='Ravi', state='asking_email'):
+    session = ConversationSession()
+    session.chat_started = True
+    session.conversation_state = state
+    session.user_data = {'name': name}
+    session.add_message(Sender.USER, name)
+    return session
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'sessions.db')
+
+
+@pytest.fixture
+def store(db_path):
+    # A long interval, so writes happen only on flush() or close().
+    store = WriteBehindStore(SqliteSessionStore(db_path), flush_seconds=60)
+    yield store
+    store.close()
+
+
+def test_saves_are_coalesced_into_one_write(store):
+    for n in range(5):
+        store.save('a', make_session(name=f"user {n}"))
+    assert store.stats()['pending'] == 1 and store.stats()['coalesced_total'] == 4
+    store.flush()
+    stats = store.stats()
+    assert (stats['written_total'], stats['flushes_total'], stats['stored_sessions']) == (1, 1, 1)
+    assert store.backend.load('a')['user_data'] == {'name': 'user 4'}
+
+
+def test_pending_saves_are_visible_before_the_flush(store):
+    session = make_session()
+    store.save('a', session)
+    session.user_data['email'] = 'ravi@example.com'
+    restored = store.load('a')
+    assert restored.user_data == {'name': 'Ravi'}
+    assert store.backend.load('a') is None
+
+
+def test_restored_after_reopening(db_path):
+    session = make_session()
+    first = WriteBehindStore(SqliteSessionStore(db_path), flush_seconds=60)
+    first.save('a', session)
+    first.close()
+    second = WriteBehindStore(SqliteSessionStore(db_path), flush_seconds=60)
+    try:
+        assert second.load('a').snapshot() == session.snapshot()
+        assert second.load('missing') is None
+    finally:
+        second.close()
+
+
+def test_delete_hides_a_stored_session(store):
+    store.save('a', make_session())
+    store.flush()
+    store.delete('a')
+    assert store.load('a') is None
+    store.flush()
+    assert store.stats()['stored_sessions'] == 0
+
+
+def test_old_sessions_are_pruned_on_open(db_path):
+    backend = SqliteSessionStore(db_path)
+    backend.write([('old', b'x')], [])
+    backend._conn.execute('UPDATE sessions SET updated = ?', (time.time() - 3 * 86400.0,))
+    backend.close()
+    for ttl_days, expected in ((0, 1), (2, 0)):
+        backend = SqliteSessionStore(db_path, ttl_days=ttl_days)
+        assert len(backend) == expected
+        backend.close()
+
+
+def test_unencodable_snapshot_is_dropped_and_others_written(store):
+    bad = make_session()
+    bad.user_data['x'] = object()
+    store.save('bad', bad)
+    store.save('good', make_session())
+    store.flush()
+    assert store.stats()['errors_total'] == 1
+    assert store.load('bad') is None and store.load('good') is not None
+
+
+def test_flush_thread_survives_backend_failures(db_path):
+    store = WriteBehindStore(SqliteSessionStore(db_path), flush_seconds=0.01)
+    try:
+        write = store.backend.write
+        store.backend.write = lambda upserts, deletes: 1 / 0
+        store.save('a', make_session())
+        deadline = time.monotonic() + 5
+        while store.stats()['errors_total'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        store.backend.write = write
+        store.save('b', make_session())
+        while store.stats()['written_total'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store._thread.is_alive()
+        assert store.backend.load('b') is not None
+    finally:
+        store.close()
+
+
+def remember_name(session, text):
+    session.add_message(Sender.USER, text)
+    session.user_data['name'] = text
+    session.conversation_state = 'asking_email'
+    return [text]
+
+
+def end_chat(session, text):
+    session.ended = True
+    return []
+
+
+def test_server_restores_sessions_after_a_restart(store):
+    async def run():
+        server = ChatServer(engine=None, store=store)
+        server.sessions['a'] = ConversationSession()
+        server._locks['a'] = asyncio.Lock()
+        await server._run_turn('a', remember_name, 'Ravi')
+        restarted = ChatServer(engine=None, store=store)
+        session, _ = await restarted._get_session('a')
+        assert session.user_data == {'name': 'Ravi'} and session.conversation_state == 'asking_email'
+        await restarted._run_turn('a', end_chat, 'bye')
+        assert store.load('a') is None
+
+    asyncio.run(run())
+
+
+def test_store_reads_do_not_block_the_event_loop(store):
+    store.save('a', make_session())
+    store.flush()
+    release = threading.Event()
+    load = store.backend.load
+
+    def slow_load(key):
+        release.wait(5)
+        return load(key)
+
+    store.backend.load = slow_load
+
+    async def run():
+        server = ChatServer(engine=None, store=store)
+        lookup = asyncio.ensure_future(server._get_session('a'))
+        # The loop keeps serving while the read waits on the backend.
+        await asyncio.sleep(0.05)
+        assert not lookup.done()
+        release.set()
+        session, _ = await lookup
+        assert session.user_data == {'name': 'Ravi'}
+
+    asyncio.run(run())
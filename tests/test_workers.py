@@ -0,0 +1,49 @@
+import os
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+import workers
+from workers import WorkerPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="the fake worker is installed by forking")
+
+
+def _fake_worker_main(index, generation, bundle_path, requests, results):
+    # Echoes its texts, except 'hang', which it never answers.
+    results.put(('ready', index, generation, os.getpid(), None, 0.0))
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        request_id, texts = message
+        if texts == ['hang']:
+            time.sleep(60)
+        results.put(('ok', index, generation, request_id, list(texts), 0.0))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(workers, '_worker_main', _fake_worker_main)
+    pool = WorkerPool('unused.cvb', workers=1, start_method='fork', monitor_interval=0.05, predict_timeout=0.5)
+    yield pool
+    pool.close()
+
+
+def test_hung_worker_times_out_and_is_replaced(pool):
+    assert pool.predict_batch(['a']) == ['a']
+    hung_pid = pool.stats()['workers'][0]['pid']
+
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        pool.predict_batch(['hang'])
+    assert time.perf_counter() - started < 5
+
+    stats = pool.stats()
+    assert stats['pending'] == 0
+    assert stats['workers'][0]['restarts'] == 1
+    assert stats['workers'][0]['generation'] == 1
+    # The replacement answers; the stuck process no longer gets requests.
+    assert pool.predict_batch(['b']) == ['b']
+    assert pool.stats()['workers'][0]['pid'] != hung_pid
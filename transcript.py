@@ -0,0 +1,65 @@
+import os
+from collections import deque
+from itertools import islice
+
+DEFAULT_WINDOW = int(os.environ.get('CAREERVIHARI_TRANSCRIPT_WINDOW', '40'))
+DEFAULT_PAGE = int(os.environ.get('CAREERVIHARI_TRANSCRIPT_PAGE', '40'))
+
+CONTAINER_OPEN = '<div class="chat-container"><div class="chat-header">CareerVihari AI - Your Career Guidance Chatbot</div><div class="chat-messages">'
+CONTAINER_CLOSE = '</div><div class="chat-controls"></div></div>'
+
+
+def custom_escape(message):
+    escape_chars = {
+        '<': '&lt;',
+        '>': '&gt;',
+        '&': '&amp;',
+        '"': '&quot;',
+        "'": '&apos;'
+    }
+    for char, escaped in escape_chars.items():
+        message = message.replace(char, escaped)
+    return message
+
+
+def render_message(message):
+    return f'<div class="chat-message {message.css_class}">{custom_escape(message.text)}</div>'
+
+
+class TranscriptView:
+    # Per-session cache of rendered message fragments. Each message is escaped
+    # and formatted once, when it first appears; a rerun only renders what is
+    # new and joins the fragments inside the visible window. Fragments are
+    # capped like the session's history they mirror.
+
+    def __init__(self, window=DEFAULT_WINDOW, page=DEFAULT_PAGE):
+        self.window = window
+        self.page = page
+        self.visible = window
+        self.fragments = deque()
+        self.rendered = 0
+        self._history = None
+
+    def sync(self, chat_history, message_count):
+        # message_count is the total ever added to chat_history, which may
+        # have dropped its oldest messages since the last sync.
+        if chat_history is not self._history or message_count < self.rendered:
+            self._history = chat_history
+            self.fragments = deque(maxlen=chat_history.maxlen)
+            self.rendered = 0
+            self.visible = self.window
+        new = min(message_count - self.rendered, len(chat_history))
+        for message in islice(chat_history, len(chat_history) - new, None):
+            self.fragments.append(render_message(message))
+        self.rendered = message_count
+
+    @property
+    def hidden_count(self):
+        return max(len(self.fragments) - self.visible, 0)
+
+    def load_older(self):
+        self.visible += self.page
+
+    def html(self):
+        visible = islice(self.fragments, max(len(self.fragments) - self.visible, 0), None) if self.visible > 0 else ()
+        return CONTAINER_OPEN + ''.join(visible) + CONTAINER_CLOSE
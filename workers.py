@@ -0,0 +1,269 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from scheduler import PREDICT_TIMEOUT
+
+DEFAULT_WORKERS = int(os.environ.get('CAREERVIHARI_WORKERS', '0'))
+RESTART_ON_CRASH = os.environ.get('CAREERVIHARI_WORKER_RESTART', '1') == '1'
+MAX_ATTEMPTS = 2
+
+
+def available_cpus():
+    # CPUs this process may run on, which can be fewer than the host has.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _worker_main(index, generation, bundle_path, requests, results):
+    # Each worker maps the same bundle file read-only, so the IDF vector and
+    # weights live once in the page cache no matter how many workers run.
+    from bundle import load_bundle
+    from classifier import predict_normalized
+
+    bundle = load_bundle(bundle_path)
+    # Pay for the lazy scipy import here, before the pool routes traffic to
+    # this worker.
+    predict_normalized(['hello'], bundle.model, bundle.classes, bundle.vectorizer)
+    results.put(('ready', index, generation, os.getpid(), None, 0.0))
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        request_id, texts = message
+        started = time.perf_counter()
+        try:
+            payload = predict_normalized(texts, bundle.model, bundle.classes, bundle.vectorizer)
+            status = 'ok'
+        except Exception as e:
+            payload = f"{type(e).__name__}: {e}"
+            status = 'error'
+        results.put((status, index, generation, request_id, payload, time.perf_counter() - started))
+
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        # Bumped on every crash, so messages from a dead process are told
+        # apart from its replacement's.
+        self.generation = 0
+        self.process = None
+        self.requests = None
+        self.pid = None
+        self.ready = False
+        self.in_flight = 0
+        self.requests_served = 0
+        self.sentences_served = 0
+        self.busy_seconds = 0.0
+        self.errors = 0
+        self.restarts = 0
+        self.alive = False
+
+
+class _Pending:
+    __slots__ = ('texts', 'future', 'worker', 'attempts')
+
+    def __init__(self, texts, future):
+        self.texts = texts
+        self.future = future
+        self.worker = None
+        self.attempts = 0
+
+
+class WorkerPool:
+    # Runs vectorize -> predict -> rank on normalized text in worker
+    # processes, sidestepping the GIL. Requests go to the worker with the fewest in
+    # flight; a worker that dies is restarted (if enabled) and its in-flight
+    # requests are retried on a live worker.
+
+    def __init__(self, bundle_path, workers=DEFAULT_WORKERS, restart_on_crash=RESTART_ON_CRASH,
+                 start_method='spawn', monitor_interval=0.5, predict_timeout=PREDICT_TIMEOUT):
+        if workers < 1:
+            raise ValueError("WorkerPool needs at least one worker")
+        self.bundle_path = os.path.abspath(bundle_path)
+        self.restart_on_crash = restart_on_crash
+        self.monitor_interval = monitor_interval
+        # A worker that holds a request this long is treated as crashed.
+        self.predict_timeout = predict_timeout
+        self._ctx = multiprocessing.get_context(start_method)
+        self._results = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._closed = False
+        self._workers = [_Worker(i) for i in range(workers)]
+        for worker in self._workers:
+            self._spawn(worker)
+        self._collector = threading.Thread(target=self._collect, name='worker-pool-collector', daemon=True)
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch, name='worker-pool-monitor', daemon=True)
+        self._monitor.start()
+
+    @property
+    def size(self):
+        return len(self._workers)
+
+    def _spawn(self, worker):
+        worker.requests = self._ctx.Queue()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.generation, self.bundle_path, worker.requests, self._results),
+            name=f'careervihari-worker-{worker.index}',
+            daemon=True,
+        )
+        worker.process.start()
+        worker.pid = worker.process.pid
+        worker.ready = False
+        worker.alive = True
+
+    def _dispatch(self, request_id, pending):
+        # Caller holds self._lock.
+        live = [w for w in self._workers if w.alive and w.ready] or [w for w in self._workers if w.alive]
+        if not live:
+            self._pending.pop(request_id, None)
+            pending.future.set_exception(RuntimeError("No live classification workers"))
+            return
+        worker = min(live, key=lambda w: w.in_flight)
+        pending.worker = worker.index
+        pending.attempts += 1
+        worker.in_flight += 1
+        worker.requests.put((request_id, pending.texts))
+
+    def _submit(self, texts):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("WorkerPool is closed")
+            request_id = next(self._ids)
+            pending = _Pending(list(texts), future)
+            self._pending[request_id] = pending
+            self._dispatch(request_id, pending)
+        return request_id, future
+
+    def submit(self, texts):
+        return self._submit(texts)[1]
+
+    def predict_batch(self, texts):
+        request_id, future = self._submit(texts)
+        try:
+            return future.result(self.predict_timeout or None)
+        except TimeoutError:
+            pass
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+            if pending is not None:
+                # The worker is alive but stuck; replace it so it stops
+                # taking new requests, and retry the rest of its work.
+                worker = self._workers[pending.worker]
+                if worker.alive:
+                    worker.process.terminate()
+                    self._handle_crash(worker, f"did not answer within {self.predict_timeout:g} s")
+                pending.future.set_exception(
+                    TimeoutError(f"Worker {worker.index} did not answer within {self.predict_timeout:g} s"))
+        # The result may have arrived while the lock was being taken.
+        return future.result()
+
+    def _collect(self):
+        while True:
+            try:
+                status, index, generation, request_id, payload, busy = self._results.get(timeout=self.monitor_interval)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                worker = self._workers[index]
+                if generation != worker.generation:
+                    # Sent by a process that has since crashed; its requests
+                    # were already retried or failed.
+                    continue
+                if status == 'ready':
+                    worker.ready = True
+                    worker.pid = request_id
+                    continue
+                pending = self._pending.pop(request_id, None)
+                worker.in_flight = max(worker.in_flight - 1, 0)
+                worker.busy_seconds += busy
+                if status == 'ok':
+                    worker.requests_served += 1
+                    worker.sentences_served += len(payload)
+                else:
+                    worker.errors += 1
+            if pending is None:
+                continue
+            if status == 'ok':
+                pending.future.set_result(payload)
+            else:
+                pending.future.set_exception(RuntimeError(f"Worker {index} failed: {payload}"))
+
+    def _watch(self):
+        while not self._closed:
+            time.sleep(self.monitor_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                for worker in self._workers:
+                    if worker.alive and not worker.process.is_alive():
+                        self._handle_crash(worker, f"exited with code {worker.process.exitcode}")
+
+    def _handle_crash(self, worker, reason):
+        # Caller holds self._lock.
+        print(f"Classification worker {worker.index} (pid {worker.pid}) {reason}")
+        worker.alive = False
+        worker.in_flight = 0
+        worker.generation += 1
+        orphaned = [(rid, p) for rid, p in self._pending.items() if p.worker == worker.index]
+        if self.restart_on_crash:
+            worker.restarts += 1
+            self._spawn(worker)
+        for request_id, pending in orphaned:
+            if pending.attempts >= MAX_ATTEMPTS:
+                del self._pending[request_id]
+                pending.future.set_exception(RuntimeError(f"Worker {worker.index} crashed while classifying this request"))
+            else:
+                self._dispatch(request_id, pending)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': [
+                    {
+                        'index': w.index,
+                        'pid': w.pid,
+                        'alive': w.alive,
+                        'ready': w.ready,
+                        'in_flight': w.in_flight,
+                        'requests': w.requests_served,
+                        'sentences': w.sentences_served,
+                        'busy_ms': round(w.busy_seconds * 1000.0, 2),
+                        'errors': w.errors,
+                        'restarts': w.restarts,
+                        'generation': w.generation,
+                    }
+                    for w in self._workers
+                ],
+                'pending': len(self._pending),
+                'restart_on_crash': self.restart_on_crash,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for worker in self._workers:
+                if worker.alive:
+                    worker.requests.put(None)
+        for worker in self._workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        with self._lock:
+            for pending in self._pending.values():
+                pending.future.set_exception(RuntimeError("WorkerPool closed"))
+            self._pending.clear()